@@ -0,0 +1,136 @@
+"""Foydalanuvchi bo'yicha anti-flood — sirpanuvchi oyna hisoblagichlari (aiogram outer middleware)."""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram.types import CallbackQuery, Message
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# class=limit/oyna_soniya; masalan "text=6/30,command=10/60,callback=30/30"
+_DEFAULT_LIMITS = "text=6/30,command=10/60,callback=30/30"
+ANTIFLOOD_LIMITS = os.getenv("ANTIFLOOD_LIMITS", _DEFAULT_LIMITS).strip()
+ANTIFLOOD_REPLY = os.getenv(
+    "ANTIFLOOD_REPLY", "⏳ Жуда тез юборяпсиз. Бироз кутиб, кейин қайта уриниб кўринг."
+).strip()
+_EVICT_EVERY = 300.0
+
+
+def parse_limits(raw: str) -> dict[str, tuple[int, float]]:
+    out: dict[str, tuple[int, float]] = {}
+    for part in (raw or "").split(","):
+        name, _, spec = part.partition("=")
+        limit, _, window = spec.partition("/")
+        try:
+            out[name.strip()] = (max(1, int(limit)), max(1.0, float(window)))
+        except ValueError:
+            continue
+    return out or parse_limits(_DEFAULT_LIMITS)
+
+
+class _Window:
+    """
+    Sirpanuvchi oyna taxmini: oldingi oyna soni og'irlik bilan + joriy son.
+    Har kalit uchun 4 ta maydon — minglab foydalanuvchi uchun ham ixcham.
+    """
+
+    __slots__ = ("start", "cur", "prev", "warned")
+
+    def __init__(self, now: float):
+        self.start = now
+        self.cur = 0
+        self.prev = 0
+        self.warned = 0.0
+
+    def hit(self, now: float, limit: int, window: float) -> bool:
+        elapsed = now - self.start
+        if elapsed >= window:
+            steps = int(elapsed // window)
+            self.prev = self.cur if steps == 1 else 0
+            self.cur = 0
+            self.start += steps * window
+            elapsed = now - self.start
+        estimate = self.prev * (1.0 - elapsed / window) + self.cur
+        if estimate >= limit:
+            return False
+        self.cur += 1
+        return True
+
+
+def classify(event: Any) -> str | None:
+    if isinstance(event, CallbackQuery):
+        return "callback"
+    if isinstance(event, Message):
+        text = event.text or event.caption or ""
+        return "command" if text.startswith("/") else "text"
+    return None
+
+
+class AntiFloodMiddleware:
+    """dp.message / dp.callback_query outer middleware. Adminlar cheklanmaydi."""
+
+    def __init__(self, is_admin: Callable[[int], bool], limits: str = ANTIFLOOD_LIMITS, reply: str = ANTIFLOOD_REPLY):
+        self.is_admin = is_admin
+        self.limits = parse_limits(limits)
+        self.reply = reply
+        self._windows: dict[tuple[int, str], _Window] = {}
+        # albom (media_group_id) — bitta xabar sifatida hisoblanadi
+        self._albums: dict[str, tuple[float, bool]] = {}
+        self._next_evict = time.monotonic() + _EVICT_EVERY
+
+    def _evict(self, now: float) -> None:
+        longest = max(w for _, w in self.limits.values())
+        stale = [k for k, w in self._windows.items() if now - w.start > 2 * longest]
+        for k in stale:
+            del self._windows[k]
+        self._albums = {g: v for g, v in self._albums.items() if now - v[0] < _EVICT_EVERY}
+        self._next_evict = now + _EVICT_EVERY
+        metrics.set_gauge("antiflood_tracked", len(self._windows))
+
+    async def __call__(
+        self,
+        handler: Callable[[Any, dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        cls = classify(event)
+        if user is None or cls not in self.limits or self.is_admin(user.id):
+            return await handler(event, data)
+
+        now = time.monotonic()
+        if now >= self._next_evict:
+            self._evict(now)
+        group = getattr(event, "media_group_id", None)
+        if group in self._albums:
+            return await handler(event, data) if self._albums[group][1] else None
+        key = (user.id, cls)
+        win = self._windows.get(key)
+        if win is None:
+            win = self._windows[key] = _Window(now)
+        limit, window = self.limits[cls]
+        allowed = win.hit(now, limit, window)
+        if group:
+            self._albums[group] = (now, allowed)
+        if allowed:
+            return await handler(event, data)
+
+        metrics.inc("antiflood_rejected")
+        metrics.inc(f"antiflood_rejected_{cls}")
+        # ogohlantirish oynada bir marta — javobning o'zi ham flood bo'lmasin
+        if now - win.warned >= window:
+            win.warned = now
+            try:
+                if isinstance(event, CallbackQuery):
+                    await event.answer(self.reply)
+                elif event.chat.type == "private":
+                    await event.answer(self.reply)
+            except Exception as e:
+                log.debug("antiflood reply: %r", e)
+        return None
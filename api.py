@@ -0,0 +1,124 @@
+"""Dashboard uchun faqat o'qiladigan HTTP JSON API — versiyalangan xotira keshi + ETag (ixtiyoriy)."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from aiohttp import web
+
+import metrics
+import versions
+
+log = logging.getLogger(__name__)
+
+API_PORT = int(os.getenv("API_PORT", "0") or 0)  # 0 — o'chirilgan
+API_HOST = os.getenv("API_HOST", "127.0.0.1").strip()
+# Bo'sh bo'lmasa — "Authorization: Bearer <token>" talab qilinadi
+API_TOKEN = os.getenv("API_TOKEN", "").strip()
+API_MAX_PER_PAGE = 100
+_CACHE_MAX = 512
+
+# key -> (versiya, body, etag)
+_CACHE: dict[tuple, tuple[tuple[int, int], bytes, str]] = {}
+
+
+@dataclass(frozen=True)
+class Source:
+    """Sinxron o'quvchilar (thread da chaqiriladi) — bot.py dagi DB funksiyalari."""
+
+    stats: Callable[[], dict]
+    employees: Callable[[], list[dict]]
+    complaints: Callable[[str, str | None, int, int], dict]
+    employee_id: Callable[[str], int | None]
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+async def _respond(request: web.Request, key: tuple, version: tuple[int, int], build: Callable[[], Any]):
+    hit = _CACHE.get(key)
+    if hit and hit[0] == version:
+        metrics.inc("api_cache_hit")
+        _, body, etag = hit
+    else:
+        metrics.inc("api_cache_miss")
+        # versiya build dan oldin olinadi — o'rtadagi yozuv keyingi so'rovda qayta quradi
+        body = json.dumps(await asyncio.to_thread(build), ensure_ascii=False).encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        _CACHE.pop(key, None)
+        _CACHE[key] = (version, body, etag)
+        while len(_CACHE) > _CACHE_MAX:
+            del _CACHE[next(iter(_CACHE))]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("If-None-Match", ""), etag):
+        metrics.inc("api_not_modified")
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
+
+
+@web.middleware
+async def _auth(request: web.Request, handler):
+    if API_TOKEN and request.headers.get("Authorization", "") != f"Bearer {API_TOKEN}":
+        raise web.HTTPUnauthorized()
+    return await handler(request)
+
+
+async def _stats(request: web.Request):
+    src: Source = request.app["source"]
+    return await _respond(request, ("stats",), versions.current(), src.stats)
+
+
+async def _employees(request: web.Request):
+    src: Source = request.app["source"]
+    return await _respond(request, ("employees",), versions.current(), src.employees)
+
+
+async def _complaints(request: web.Request):
+    src: Source = request.app["source"]
+    name = request.match_info["name"]
+    eid = src.employee_id(name)
+    if eid is None:
+        raise web.HTTPNotFound()
+    status = request.query.get("status", "").upper() or None
+    if status not in (None, "NEW", "DONE", "REJECT"):
+        raise web.HTTPBadRequest(text="status: NEW | DONE | REJECT")
+    try:
+        page = max(0, int(request.query.get("page", "0")))
+        per_page = min(API_MAX_PER_PAGE, max(1, int(request.query.get("per_page", "20"))))
+    except ValueError:
+        raise web.HTTPBadRequest(text="page, per_page: butun son")
+    return await _respond(
+        request,
+        ("complaints", eid, status, page, per_page),
+        versions.current(eid),
+        lambda: src.complaints(name, status, per_page, page * per_page),
+    )
+
+
+async def start(source: Source) -> web.AppRunner | None:
+    if not API_PORT:
+        return None
+    app = web.Application(middlewares=[_auth])
+    app["source"] = source
+    app.router.add_get("/api/v1/stats", _stats)
+    app.router.add_get("/api/v1/employees", _employees)
+    app.router.add_get("/api/v1/employees/{name}/complaints", _complaints)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, API_HOST, API_PORT).start()
+    except OSError as e:
+        # API ixtiyoriy — bot ishlashda davom etadi
+        log.error("API start failed on %s:%s: %r", API_HOST, API_PORT, e)
+        await runner.cleanup()
+        return None
+    log.info("API: http://%s:%s/api/v1/", API_HOST, API_PORT)
+    return runner
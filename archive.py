@@ -0,0 +1,72 @@
+"""Hal qilingan eski shikoyatlar arxiv DB ga — jonli jadval kichik qoladi."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+
+import schema
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))  # 0 — o'chirilgan
+ARCHIVE_BATCH = max(50, int(os.getenv("ARCHIVE_BATCH", "500")))
+
+ARCHIVE_SCHEMA = "arch"
+# O'qish so'rovlari shu view orqali — jonli + arxiv birga
+ALL_VIEW = "complaints_all"
+
+
+def archive_db_path(db_path: str) -> str:
+    root, ext = os.path.splitext(os.path.abspath(db_path))
+    return f"{root}_archive{ext or '.sqlite3'}"
+
+
+def attach_archive(con: sqlite3.Connection, archive_path: str, *, view: bool = True) -> None:
+    con.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_path,))
+    if view:
+        con.execute(schema.view_sql(ALL_VIEW))
+
+
+def archive_batch(con: sqlite3.Connection, cutoff: str, batch: int = ARCHIVE_BATCH) -> int:
+    """
+    cutoff dan oldin qaror qilingan DONE/REJECT larni `batch` tadan ko'chiradi.
+    WAL da ATTACH qilingan fayllar orasidagi tranzaksiya atomar emas — har qadam bitta faylga:
+    1) arxivga nusxa va commit; 2) jonlidan o'chirish (nusxasi borlari). Uzilsa qayta ishlash xavfsiz:
+    INSERT OR REPLACE nusxani yangilaydi, o'chirish nusxa bo'lmasa hech narsa qilmaydi.
+    """
+    ids = [
+        r[0]
+        for r in con.execute(
+            """
+            SELECT id FROM main.complaints
+            WHERE status IN ('DONE', 'REJECT') AND decided_at < ?
+            ORDER BY id LIMIT ?
+            """,
+            (cutoff, batch),
+        ).fetchall()
+    ]
+    if not ids:
+        return 0
+    marks = ",".join("?" * len(ids))
+    with con:
+        con.execute(
+            f"INSERT OR REPLACE INTO arch.complaints({schema.COLUMNS}) "
+            f"SELECT {schema.COLUMNS} FROM main.complaints WHERE id IN ({marks})",
+            ids,
+        )
+    with con:
+        # oraliqda qayta ochilgani (NEW) jonlida qoladi
+        con.execute(
+            f"""
+            DELETE FROM main.complaints
+            WHERE id IN ({marks}) AND status IN ('DONE', 'REJECT') AND decided_at < ?
+              AND id IN (SELECT id FROM arch.complaints WHERE id IN ({marks}))
+            """,
+            (*ids, cutoff, *ids),
+        )
+    with con:
+        # jonlida qolganlarining eskirgan nusxasi — view da ikki marta ko'rinmasin
+        con.execute(
+            f"DELETE FROM arch.complaints WHERE id IN ({marks}) AND id IN (SELECT id FROM main.complaints)",
+            ids,
+        )
+    return len(ids)
@@ -0,0 +1,66 @@
+"""
+Qabul yo'li benchmarki: har yozuv alohida commit (add_complaint + set_group_message)
+va guruhli commit (WriteQueue). Vaqtinchalik DB da ishlaydi.
+
+    python bench_writes.py [N] [--batch 64] [--delay-ms 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+
+async def bench_queue(bot, n: int) -> float:
+    async def one(i: int):
+        cid = await bot.queue_complaint("Bench", 1000 + i % 50, f"user{i % 50}", f"burst {i}")
+        await bot.queue_group_message(cid, -1, i)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - t0
+    await bot.WRITES.close()
+    return elapsed
+
+
+def bench_direct(bot, n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        cid = bot.add_complaint("Bench", 1000 + i % 50, f"user{i % 50}", f"burst {i}")
+        bot.set_group_message(cid, -1, i)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("n", nargs="?", type=int, default=500)
+    ap.add_argument("--batch", type=int, default=64)
+    ap.add_argument("--delay-ms", type=float, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_writes_")
+    os.environ["DB_PATH"] = os.path.join(tmp, "bench.sqlite3")
+    os.environ["WRITE_BATCH_MAX"] = str(args.batch)
+    os.environ["WRITE_BATCH_DELAY_MS"] = str(args.delay_ms)
+    try:
+        import bot
+        import metrics
+
+        bot.init_db()
+        direct = bench_direct(bot, args.n)
+        queued = asyncio.run(bench_queue(bot, args.n))
+        commits = metrics.counter("write_commits")
+        ops = 2 * args.n
+        print(f"{args.n} ta shikoyat ({ops} yozuv), batch={args.batch}, delay={args.delay_ms}ms")
+        print(f"  alohida commit : {direct:6.2f}s  {ops / direct:8.0f} yozuv/s  {ops} commit  {ops / direct:8.0f} commit/s")
+        print(f"  guruhli commit : {queued:6.2f}s  {ops / queued:8.0f} yozuv/s  {commits} commit  {commits / queued:8.0f} commit/s")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
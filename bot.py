@@ -1,24 +1,53 @@
+import time
+_BOOT_T0 = time.monotonic()  # import вақтини ҳам ўлчаш учун энг биринчи
 import os
 import re
+import shutil
 import asyncio
+import tempfile
 import logging
 import sqlite3
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot, Dispatcher, F, Router
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, FSInputFile, InputMediaDocument, InputMediaPhoto
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-
 from yordamchi_push import push_to_yordamchi_hub, push_to_yordamchi_hub_background, today_iso
 
-from persist_data import bootstrap_persistence, persistence_status_line, resolve_db_path
+from persist_data import (
+    bootstrap_persistence,
+    persistence_status_line,
+    prepare_sqlite_file,
+    resolve_db_path,
+    sqlite_maintenance,
+    startup_sqlite_backup,
+)
+
+import reports
+import export_data
+import archive
+import schema
+import metrics
+import dedup
+import sla
+import versions
+import api
+import migrations
+import writeq
+import events
+import departments
+import outbox
+import shards
+import hub_sync
+from antiflood import AntiFloodMiddleware
+from leader_lease import LeaderLease, lease_db_path
+from lifecycle import SHUTDOWN_DEADLINE, InflightMiddleware, Shutdown, drain, pending_count, spawn
 
 # ===================== CONFIG (Railway env) =====================
 BOT_TOKEN = os.getenv("BOT_TOKEN", "8381505129:AAG0X7jwRHUScfwFrsxi5C5QTwGuwfn3RIE").strip()
@@ -26,15 +55,23 @@ GROUP_ID_RAW = os.getenv("GROUP_ID", "-1001877019294").strip()
 ADMIN_IDS_RAW = os.getenv("ADMIN_IDS", "1432810519").strip()
 TEST_MODE = os.getenv("TEST_MODE", "0").strip() == "1"
 RESET_CODE = os.getenv("RESET_CODE", "BRON-2026-RESET").strip()
-_DB_BOOT = bootstrap_persistence(
-    resolve_db_path(default_filename="complaints.sqlite3"),
-    legacy_names=("complaints.sqlite3",),
-)
-DB_PATH = _DB_BOOT["db_path"]
+# bootstrap_persistence энди main() да — import пайтида файл нусхаси йўқ
+DB_PATH = os.path.abspath(resolve_db_path(default_filename="complaints.sqlite3"))
+ARCHIVE_PATH = archive.archive_db_path(DB_PATH)
 TZ_NAME = os.getenv("TZ", "Asia/Tashkent").strip()
 
 TZ = ZoneInfo(TZ_NAME)
 
+# Ҳисоботлар: ҳар куни DAILY_REPORT_AT да кечаги кун, WEEKLY_REPORT_DAY да ҳафталик
+DAILY_REPORT_AT = os.getenv("DAILY_REPORT_AT", "08:00").strip()
+WEEKLY_REPORT_DAY = os.getenv("WEEKLY_REPORT_DAY", "mon").strip().lower()
+# Гуруҳ карточкаларини оммавий таҳрирлаш оралиғи (Telegram: гуруҳга ~20 хабар/мин)
+CARD_EDIT_INTERVAL = max(0.0, float(os.getenv("CARD_EDIT_INTERVAL", "3")))
+# Альбом (media_group_id) қисмлари шунча сония ичида йиғилади — битта шикоят
+ALBUM_WAIT = max(0.3, float(os.getenv("ALBUM_WAIT", "1.5")))
+# Панелда "N кундан эски NEW ларни рад этиш" тугмалари
+BULK_OLDER_DAYS = [int(x) for x in os.getenv("BULK_OLDER_DAYS", "7,30").split(",") if x.strip().isdigit()]
+
 # Ходимлар: 5 та (сен айтганингдек). Истасанг env орқали ҳам берса бўлади.
 # Формат: EMPLOYEES="Сагдуллаев Юнус;Самадов Тулкин;Тохиров Муслимбек;Шерназаров Толиб;Рахаббоев Пулат"
 EMPLOYEES_ENV = os.getenv("EMPLOYEES", "").strip()
@@ -79,6 +116,20 @@ if not ADMIN_IDS:
     # сен биринчиси бўлиб қолсин деб, мажбурий қиляпман:
     raise RuntimeError("ADMIN_IDS is empty. Set Railway variable ADMIN_IDS (your Telegram numeric id).")
 
+# Бўлимлар: ходим -> гуруҳ ва админлар. DEPARTMENTS бўш — битта бўлим (GROUP_ID, ADMIN_IDS, EMPLOYEES).
+# ADMIN_IDS — бош админлар: ҳамма бўлим, экспорт/reset.
+try:
+    DEPTS = departments.Routing(
+        departments.parse_departments(
+            os.getenv("DEPARTMENTS", ""),
+            departments.Department("main", "Асосий", GROUP_ID, frozenset(ADMIN_IDS), tuple(EMPLOYEES)),
+        ),
+        super_admins=ADMIN_IDS,
+    )
+except ValueError as e:
+    raise RuntimeError(str(e))
+EMPLOYEES = DEPTS.employees
+
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("nazorat-bot")
 
@@ -87,31 +138,28 @@ log = logging.getLogger("nazorat-bot")
 def db() -> sqlite3.Connection:
     con = sqlite3.connect(DB_PATH)
     con.row_factory = sqlite3.Row
+    # Ўқиш: complaints_all (жонли + архив). Ёзиш: complaints (фақат жонли)
+    archive.attach_archive(con, ARCHIVE_PATH)
     return con
 
-def init_db():
-    con = db()
-    cur = con.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS complaints (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee TEXT NOT NULL,
-            from_user_id INTEGER NOT NULL,
-            from_user_name TEXT NOT NULL,
-            text TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            status TEXT NOT NULL DEFAULT 'NEW',  -- NEW / DONE / REJECT
-            decided_by INTEGER,
-            decided_at TEXT,
-            decision_note TEXT,
-            group_chat_id INTEGER,
-            group_message_id INTEGER
-        )
-    """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_complaints_employee ON complaints(employee)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_complaints_status ON complaints(status)")
-    con.commit()
+def init_db() -> bool:
+    """Қайтаради: миграциядан олдин захира олиндими (олинган бўлса фондаги startup захираси керак эмас)."""
+    backed_up = False
+    # мавжуд база ва қўлланмаган қадам — WAL/VACUUM ва DDL дан олдин, синхрон нусха
+    if os.path.isfile(DB_PATH) and os.path.getsize(DB_PATH) and migrations.is_behind(DB_PATH):
+        backed_up = startup_sqlite_backup(DB_PATH) is not None
+        if not backed_up:
+            raise RuntimeError("Миграциядан олдинги захира олинмади — миграция тўхтатилди")
+    for path in (DB_PATH, ARCHIVE_PATH):
+        prepare_sqlite_file(path)
+    # view сиз уланиш: эски матнли схемани integer калитларга кўчириш (RENAME view ни текширади)
+    con = sqlite3.connect(DB_PATH)
+    archive.attach_archive(con, ARCHIVE_PATH, view=False)
+    applied = migrations.migrate(con, EMPLOYEES)
     con.close()
+    if applied:
+        log.warning("DB migrations: %s", ", ".join(applied))
+    return backed_up
 
 def now_str() -> str:
     return datetime.now(TZ).strftime("%Y-%m-%d %H:%M:%S")
@@ -130,14 +178,16 @@ def employee_tg_id(employee: str) -> int | None:
 def complaint_counts_for_day(employee: str, day_iso: str) -> tuple[int, int, int]:
     """(ochiq NEW, yopilgan DONE, rad REJECT) — shu kun."""
     con = db()
+    eid = schema.lookup_employee_id(con, employee)
+    next_day = (datetime.fromisoformat(day_iso) + timedelta(days=1)).date().isoformat()
     rows = con.execute(
         """
-        SELECT status, COUNT(*) AS cnt FROM complaints
-        WHERE employee = ? AND created_at LIKE ?
+        SELECT status, COUNT(*) AS cnt FROM complaints_all
+        WHERE employee_id = ? AND created_at >= ? AND created_at < ?
         GROUP BY status
         """,
-        (employee, f"{day_iso}%"),
-    ).fetchall()
+        (eid, day_iso, next_day),
+    ).fetchall() if eid is not None else []
     con.close()
     ochiq = done = rad = 0
     for r in rows:
@@ -152,121 +202,414 @@ def complaint_counts_for_day(employee: str, day_iso: str) -> tuple[int, int, int
     return ochiq, done, rad
 
 
-async def sync_employee_hub(employee: str, day_iso: str | None = None) -> None:
-    """Hub ga ochiq shikoyatlar — bartaraf/rad ochko bermaydi."""
+async def push_hub_summary(tg_id: int, summary: str, day_iso: str) -> bool:
+    ok, how = await push_to_yordamchi_hub(tg_id=tg_id, bot_key="ishxona", summary=summary, day_iso=day_iso)
+    if not ok:
+        log.warning("Hub push %s %s: %s", tg_id, day_iso, how)
+    return ok
+
+async def sync_employee_hub(employee: str, day_iso: str | None = None) -> bool:
+    """Hub ga ochiq shikoyatlar — bartaraf/rad ochko bermaydi. False — push xato (qayta urinish kerak)."""
     tid = employee_tg_id(employee)
     if not tid:
         log.warning("Hub: tg_id topilmadi: %s", employee)
-        return
+        return True  # yuboradigan joy yo'q — qayta urinishdan foyda yo'q
+    day = day_iso or today_iso()
+    summary = hub_sync.summary_text(*complaint_counts_for_day(employee, day))
+    if await push_hub_summary(tid, summary, day):
+        # muvaffaqiyatli — reconcile bu kunni qayta yubormaydi; xato bo'lsa tungi reconcile tuzatadi
+        con = db()
+        hub_sync.record_pushed(con, schema.employee_id(con, employee), day, summary)
+        con.commit()
+        con.close()
+        return True
+    return False
+
+# O'tgan kunlar: /hub_backfill va tungi reconcile — faqat o'zgargan (xodim, kun) lar
+HUB = hub_sync.Reconciler(db, employee_tg_id, push_hub_summary)
+
+def mark_hub_pending(employee: str, day_iso: str):
+    con = db()
+    con.execute("INSERT OR IGNORE INTO hub_pending(employee, day) VALUES(?, ?)", (employee, day_iso))
+    con.commit()
+    con.close()
+
+def list_hub_pending() -> list[tuple[str, str]]:
+    con = db()
+    rows = con.execute("SELECT employee, day FROM hub_pending ORDER BY day, employee").fetchall()
+    con.close()
+    return [(r["employee"], r["day"]) for r in rows]
+
+def clear_hub_pending(employee: str, day_iso: str):
+    # faqat push muvaffaqiyatli bo'lgach — yiqilsa/uzilsa qator qoladi
+    con = db()
+    con.execute("DELETE FROM hub_pending WHERE employee = ? AND day = ?", (employee, day_iso))
+    con.commit()
+    con.close()
+
+def schedule_hub_sync(employee: str, day_iso: str | None = None):
+    """Handler дан ташқарида; SIGTERM да улгурмаса hub_pending га ёзилади."""
     day = day_iso or today_iso()
-    ochiq, done, rad = complaint_counts_for_day(employee, day)
-    summary = f"Ishxona: ochiq={ochiq}, yopilgan={done}, rad={rad}"
-    await push_to_yordamchi_hub(tg_id=tid, bot_key="ishxona", summary=summary, day_iso=day)
+    spawn(
+        sync_employee_hub(employee, day_iso=day),
+        name=f"hub_sync:{employee}",
+        persist=lambda: mark_hub_pending(employee, day),
+    )
 
 def short_now() -> str:
     return datetime.now(TZ).strftime("%d.%m.%Y %H:%M")
 
-def add_complaint(employee: str, from_user_id: int, from_user_name: str, text: str) -> int:
-    con = db()
+def _insert_complaint(
+    con: sqlite3.Connection, employee: str, from_user_id: int, from_user_name: str, text: str,
+    media: list[tuple[str, str]] = (),
+) -> tuple[int, int]:
+    """(cid, employee_id); commit чақирувчида."""
     cur = con.cursor()
+    eid = schema.employee_id(con, employee)
+    created_at = now_str()
     cur.execute("""
-        INSERT INTO complaints(employee, from_user_id, from_user_name, text, created_at, status)
-        VALUES(?,?,?,?,?, 'NEW')
-    """, (employee, from_user_id, from_user_name, text, now_str()))
+        INSERT INTO complaints(employee_id, reporter_id, text, created_at, status)
+        VALUES(?,?,?,?, 'NEW')
+    """, (
+        eid,
+        schema.reporter_id(con, from_user_id, from_user_name),
+        text,
+        created_at,
+    ))
     cid = cur.lastrowid
-    con.commit()
-    con.close()
-    return int(cid)
+    events.record(con, [(cid, eid, None, "NEW")], "created", created_at, actor=from_user_id)
+    if media:
+        cur.executemany(
+            "INSERT INTO complaint_media(complaint_id, kind, file_id) VALUES(?,?,?)",
+            [(cid, kind, file_id) for kind, file_id in media],
+        )
+    return int(cid), eid
 
-def set_group_message(cid: int, chat_id: int, msg_id: int):
-    con = db()
-    cur = con.cursor()
-    cur.execute("""
+def _set_group_message(con: sqlite3.Connection, cid: int, chat_id: int, msg_id: int):
+    con.execute("""
         UPDATE complaints
         SET group_chat_id=?, group_message_id=?
         WHERE id=?
     """, (chat_id, msg_id, cid))
+
+def add_complaint(
+    employee: str, from_user_id: int, from_user_name: str, text: str, media: list[tuple[str, str]] = ()
+) -> int:
+    con = db()
+    cid, eid = _insert_complaint(con, employee, from_user_id, from_user_name, text, media)
+    con.commit()
+    con.close()
+    versions.bump(eid)
+    return cid
+
+def set_group_message(cid: int, chat_id: int, msg_id: int):
+    con = db()
+    _set_group_message(con, cid, chat_id, msg_id)
     con.commit()
     con.close()
 
+# Қабул йўли: бир вақтда келган ёзувлар битта commit да (WRITE_BATCH_MAX / WRITE_BATCH_DELAY_MS)
+WRITES = writeq.WriteQueue(DB_PATH)
+
+async def queue_complaint(
+    employee: str, from_user_id: int, from_user_name: str, text: str, media: list[tuple[str, str]] = ()
+) -> int:
+    cid, eid = await WRITES.submit(
+        lambda con: _insert_complaint(con, employee, from_user_id, from_user_name, text, media)
+    )
+    versions.bump(eid)
+    return cid
+
+async def queue_group_message(cid: int, chat_id: int, msg_id: int):
+    await WRITES.submit(lambda con: _set_group_message(con, cid, chat_id, msg_id))
+
 def get_complaint(cid: int):
     con = db()
     cur = con.cursor()
-    cur.execute("SELECT * FROM complaints WHERE id=?", (cid,))
+    cur.execute("SELECT * FROM complaints_all WHERE id=?", (cid,))
     row = cur.fetchone()
     con.close()
     return row
 
-def update_status(cid: int, status: str, decided_by: int, note: str = ""):
+def append_complaint_text(cid: int, text: str, from_user_name: str) -> bool:
+    """Ўхшаш шикоятни мавжудига қўшиш (фақат NEW бўлса)."""
     con = db()
     cur = con.cursor()
     cur.execute("""
+        UPDATE complaints SET text = text || ?
+        WHERE id=? AND status='NEW'
+    """, (f"\n\n➕ {short_now()} — {from_user_name}:\n{text}", cid))
+    ok = cur.rowcount > 0
+    row = cur.execute("SELECT employee_id FROM complaints WHERE id=?", (cid,)).fetchone()
+    if ok:
+        events.record(con, [(cid, row["employee_id"], "NEW", "NEW")], "edited", now_str(), note=from_user_name)
+    con.commit()
+    con.close()
+    if ok:
+        versions.bump(row["employee_id"])
+    return ok
+
+def update_status(cid: int, status: str, decided_by: int, note: str = ""):
+    con = db()
+    cur = con.cursor()
+    decided_at = now_str()
+    prev = cur.execute("SELECT employee_id, status FROM complaints WHERE id=?", (cid,)).fetchone()
+    if prev:
+        events.record(
+            con, [(cid, prev["employee_id"], prev["status"], status)], "decided", decided_at, decided_by, note
+        )
+    cur.execute(f"""
         UPDATE complaints
-        SET status=?, decided_by=?, decided_at=?, decision_note=?
+        SET status=?, decided_by=?, decided_at=?, decision_note=?,
+            decision_secs={schema.DECISION_SECS_SQL.format(decided="?")}
         WHERE id=?
-    """, (status, decided_by, now_str(), note, cid))
+    """, (status, decided_by, decided_at, note, decided_at, cid))
+    cur.execute("DELETE FROM sla_escalations WHERE complaint_id=?", (cid,))
+    row = cur.execute("SELECT employee_id, decision_secs FROM complaints WHERE id=?", (cid,)).fetchone()
     con.commit()
     con.close()
+    if row:
+        versions.bump(row["employee_id"])
+    if row and row["decision_secs"] is not None:
+        metrics.observe("decision_secs", row["decision_secs"])
+
+def _decide_new(
+    con: sqlite3.Connection, employee_id: int | None, ids: list[int], status: str, decided_by: int, note: str
+) -> list:
+    """
+    ids ичидан фақат шу ходимнинг NEW ларини битта транзакцияда ёпади (callback даги бегона id лар
+    ташланади); ўзгарган қаторлар (complaints_all) қайтади.
+    """
+    if not ids or employee_id is None:
+        return []
+    # чақирувчи ҳеч нарса ёзмаган бўлиши керак — BEGIN IMMEDIATE очиқ транзакция ичида йиқилади
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        marks = ",".join("?" * len(ids))
+        found = con.execute(
+            f"SELECT id, employee_id FROM complaints WHERE status='NEW' AND employee_id=? AND id IN ({marks})",
+            (employee_id, *ids),
+        ).fetchall()
+        ids = [r[0] for r in found]
+        if ids:
+            marks = ",".join("?" * len(ids))
+            decided_at = now_str()
+            events.record(
+                con, [(r[0], r[1], "NEW", status) for r in found], "decided", decided_at, decided_by, note or None
+            )
+            con.execute(f"""
+                UPDATE complaints
+                SET status=?, decided_by=?, decided_at=?, decision_note=?,
+                    decision_secs={schema.DECISION_SECS_SQL.format(decided="?")}
+                WHERE id IN ({marks})
+            """, (status, decided_by, decided_at, note, decided_at, *ids))
+            con.execute(f"DELETE FROM sla_escalations WHERE complaint_id IN ({marks})", ids)
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    if not ids:
+        return []
+    rows = con.execute(
+        f"SELECT * FROM complaints_all WHERE id IN ({marks}) ORDER BY id", ids
+    ).fetchall()
+    for r in rows:
+        metrics.observe("decision_secs", r["decision_secs"] or 0)
+    versions.bump(*(r["employee_id"] for r in rows))
+    return rows
 
-def stats():
+def bulk_update_status(employee: str, cids: list[int], status: str, decided_by: int, note: str = "") -> list:
     con = db()
-    cur = con.cursor()
-    cur.execute("SELECT COUNT(*) AS c FROM complaints")
-    total = cur.fetchone()["c"]
-    cur.execute("SELECT COUNT(*) AS c FROM complaints WHERE status='NEW'")
-    new = cur.fetchone()["c"]
-    cur.execute("SELECT COUNT(*) AS c FROM complaints WHERE status='DONE'")
-    done = cur.fetchone()["c"]
-    cur.execute("SELECT COUNT(*) AS c FROM complaints WHERE status='REJECT'")
-    rej = cur.fetchone()["c"]
+    rows = _decide_new(con, schema.lookup_employee_id(con, employee), list(cids), status, decided_by, note)
+    con.close()
+    return rows
+
+def bulk_reject_older(employee: str, cutoff: str, decided_by: int, note: str = "") -> list:
+    """cutoff дан олдинги NEW лар — танлаш ва ёпиш битта транзакцияда."""
+    con = db()
+    # фақат SELECT — employee_id() нинг INSERT и бу ерда яширин транзакция очарди
+    eid = schema.lookup_employee_id(con, employee)
+    ids = [
+        r[0] for r in con.execute(
+            "SELECT id FROM complaints WHERE employee_id=? AND status='NEW' AND created_at < ?",
+            (eid, cutoff),
+        ).fetchall()
+    ]
+    rows = _decide_new(con, eid, ids, "REJECT", decided_by, note)
     con.close()
-    return total, new, done, rej
+    return rows
+
+def count_new_older(employee: str, cutoff: str) -> int:
+    con = db()
+    c = con.execute(
+        "SELECT COUNT(*) FROM complaints WHERE employee_id=? AND status='NEW' AND created_at < ?",
+        (schema.lookup_employee_id(con, employee), cutoff),
+    ).fetchone()[0]
+    con.close()
+    return int(c)
+
+def reopen_complaint(cid: int, actor: int) -> bool:
+    """DONE/REJECT -> NEW (фақат жонли жадвалда; архивдагилар қайта очилмайди)."""
+    con = db()
+    row = con.execute("SELECT employee_id, status FROM complaints WHERE id=?", (cid,)).fetchone()
+    if not row or row["status"] == "NEW":
+        con.close()
+        return False
+    events.record(con, [(cid, row["employee_id"], row["status"], "NEW")], "reopened", now_str(), actor)
+    con.execute("""
+        UPDATE complaints
+        SET status='NEW', decided_by=NULL, decided_at=NULL, decision_note=NULL, decision_secs=NULL
+        WHERE id=?
+    """, (cid,))
+    con.execute("DELETE FROM sla_escalations WHERE complaint_id=?", (cid,))
+    con.commit()
+    con.close()
+    versions.bump(row["employee_id"])
+    return True
+
+def _sum_totals(t: dict[int, tuple[int, int, int]], eids: set[int] | None):
+    vals = [v for eid, v in t.items() if eids is None or eid in eids]
+    new, done, rej = (sum(v[i] for v in vals) for i in range(3))
+    return new + done + rej, new, done, rej
+
+def stats(eids: set[int] | None = None):
+    """(жами, NEW, DONE, REJECT) — event_totals дан; complaints скан қилинмайди. eids — бўлим ходимлари."""
+    con = db()
+    t = events.totals(con)
+    con.close()
+    return _sum_totals(t, eids)
+
+def stats_as_of(at: str, eids: set[int] | None = None):
+    """Ўтган вақт нуқтасидаги ҳолат — кунлик назорат нуқтаси + ўша кун ҳодисалари."""
+    con = db()
+    t = events.as_of(con, at)
+    con.close()
+    return _sum_totals(t, eids)
 
 def list_by_employee(employee: str, status: str | None = None, limit: int = 10, offset: int = 0):
     con = db()
     cur = con.cursor()
+    eid = schema.lookup_employee_id(con, employee)
+    if eid is None:
+        con.close()
+        return []
     if status:
         cur.execute("""
-            SELECT * FROM complaints
-            WHERE employee=? AND status=?
+            SELECT * FROM complaints_all
+            WHERE employee_id=? AND status=?
             ORDER BY id DESC
             LIMIT ? OFFSET ?
-        """, (employee, status, limit, offset))
+        """, (eid, status, limit, offset))
     else:
         cur.execute("""
-            SELECT * FROM complaints
-            WHERE employee=?
+            SELECT * FROM complaints_all
+            WHERE employee_id=?
             ORDER BY id DESC
             LIMIT ? OFFSET ?
-        """, (employee, limit, offset))
+        """, (eid, limit, offset))
     rows = cur.fetchall()
     con.close()
     return rows
 
 def count_by_employee(employee: str, status: str | None = None) -> int:
     con = db()
-    cur = con.cursor()
+    eid = schema.lookup_employee_id(con, employee)
+    new, done, rej = events.totals(con).get(eid, (0, 0, 0))
+    con.close()
     if status:
-        cur.execute("SELECT COUNT(*) AS c FROM complaints WHERE employee=? AND status=?", (employee, status))
-    else:
-        cur.execute("SELECT COUNT(*) AS c FROM complaints WHERE employee=?", (employee,))
-    c = cur.fetchone()["c"]
+        return {"NEW": new, "DONE": done, "REJECT": rej}.get(status, 0)
+    return new + done + rej
+
+EMPLOYEE_KEYS: dict[str, int] = {}
+
+def employee_key(name: str) -> int | None:
+    """API/панел: фақат EMPLOYEES даги ном (init_db да лўғатга ёзилган) — фақат SELECT."""
+    if name not in EMPLOYEES:
+        return None
+    eid = EMPLOYEE_KEYS.get(name)
+    if eid is None:
+        con = db()
+        eid = schema.lookup_employee_id(con, name)
+        con.close()
+        if eid is not None:
+            EMPLOYEE_KEYS[name] = eid
+    return eid
+
+def employee_overview() -> list[dict]:
+    """Ходим бўйича NEW/DONE/REJECT ва энг эски очиқ шикоят — битта GROUP BY."""
+    con = db()
+    rows = con.execute("""
+        SELECT employee,
+               SUM(status='NEW') AS new, SUM(status='DONE') AS done, SUM(status='REJECT') AS rej,
+               COUNT(*) AS total, MIN(CASE WHEN status='NEW' THEN created_at END) AS oldest_open
+        FROM complaints_all
+        GROUP BY employee_id
+    """).fetchall()
     con.close()
-    return int(c)
+    by_name = {r["employee"]: r for r in rows}
+    out = []
+    for emp in EMPLOYEES:
+        r = by_name.get(emp)
+        out.append({
+            "employee": emp,
+            "department": DEPTS.for_employee(emp).key,
+            "new": int(r["new"]) if r else 0,
+            "done": int(r["done"]) if r else 0,
+            "reject": int(r["rej"]) if r else 0,
+            "total": int(r["total"]) if r else 0,
+            "oldest_open": r["oldest_open"] if r else None,
+        })
+    return out
+
+def complaints_page(employee: str, status: str | None, limit: int, offset: int) -> dict:
+    rows = list_by_employee(employee, status=status, limit=limit, offset=offset)
+    return {
+        "employee": employee,
+        "status": status,
+        "total": count_by_employee(employee, status),
+        "offset": offset,
+        "items": [
+            {
+                "id": r["id"],
+                "status": r["status"],
+                "created_at": r["created_at"],
+                "decided_at": r["decided_at"],
+                "decision_secs": r["decision_secs"],
+                "text": r["text"],
+            }
+            for r in rows
+        ],
+    }
 
 def reset_all():
     con = db()
     cur = con.cursor()
     cur.execute("DELETE FROM complaints")
     cur.execute("DELETE FROM sqlite_sequence WHERE name='complaints'")
+    cur.execute("DELETE FROM daily_rollups")
+    cur.execute("DELETE FROM arch.complaints")
+    cur.execute("DELETE FROM sla_escalations")
+    cur.execute("DELETE FROM complaint_media")
+    cur.execute("DELETE FROM complaint_events")
+    cur.execute("DELETE FROM sqlite_sequence WHERE name='complaint_events'")
+    cur.execute("DELETE FROM event_totals")
+    cur.execute("DELETE FROM event_checkpoints")
     con.commit()
     con.close()
+    versions.bump_all()
 
 
 # ===================== UI helpers =====================
 def is_admin(user_id: int) -> bool:
+    return DEPTS.is_admin(user_id)
+
+def is_super_admin(user_id: int) -> bool:
     return user_id in ADMIN_IDS
 
+def can_manage(user_id: int, employee: str) -> bool:
+    """Бўлим админи фақат ўз бўлими ходимлари шикоятларини кўради ва ҳал қилади."""
+    return DEPTS.can_manage(user_id, employee)
+
 def fmt_user_name(m: Message) -> str:
     # Ism фамилия бўлса — шуни оламиз
     name = (m.from_user.full_name or "").strip() if m.from_user else ""
@@ -289,7 +632,13 @@ def admin_card(row) -> str:
 def escape_html(s: str) -> str:
     return (s or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
 
+# Ўзгармас клавиатуралар ва панел саҳифалари — versions бўйича эскиради
+RENDER_CACHE = versions.VersionedCache("render_cache")
+
 def kb_employee_select():
+    return RENDER_CACHE.get("kb_employee_select", None, _build_kb_employee_select)
+
+def _build_kb_employee_select():
     kb = InlineKeyboardBuilder()
     for i, emp in enumerate(EMPLOYEES):
         kb.button(text=emp, callback_data=f"emp:{i}")
@@ -303,10 +652,25 @@ def kb_admin_actions(cid: int):
     kb.adjust(2)
     return kb.as_markup()
 
-def kb_admin_panel_employees():
+def kb_dupe_confirm():
+    kb = InlineKeyboardBuilder()
+    kb.button(text="➕ Мавжудига қўшиш", callback_data="dupe:merge")
+    kb.button(text="🆕 Янги шикоят", callback_data="dupe:new")
+    kb.adjust(1)
+    return kb.as_markup()
+
+def kb_admin_panel_employees(user_id: int):
+    depts = tuple(d.key for d in DEPTS.for_admin(user_id))
+    return RENDER_CACHE.get(
+        ("kb_admin_panel_employees", depts), None, lambda: _build_kb_admin_panel_employees(user_id)
+    )
+
+def _build_kb_admin_panel_employees(user_id: int):
     kb = InlineKeyboardBuilder()
+    allowed = set(DEPTS.employees_for(user_id))
     for i, emp in enumerate(EMPLOYEES):
-        kb.button(text=f"📂 {emp}", callback_data=f"panel_emp:{i}:0")
+        if emp in allowed:
+            kb.button(text=f"📂 {emp}", callback_data=f"panel_emp:{i}:0")
     kb.adjust(1)
     return kb.as_markup()
 
@@ -316,8 +680,38 @@ def kb_panel_pager(emp_index: int, page: int, total_pages: int):
         kb.button(text="⬅️ Олдинги", callback_data=f"panel_emp:{emp_index}:{page-1}")
     if page < total_pages - 1:
         kb.button(text="Кейинги ➡️", callback_data=f"panel_emp:{emp_index}:{page+1}")
+    kb.button(text="☑️ Кўп танлаш", callback_data=f"psel:{emp_index}:0")
     kb.button(text="🔙 Орқага", callback_data="panel_back")
-    kb.adjust(2, 1)
+    kb.adjust(2, 1, 1)
+    return kb.as_markup()
+
+def kb_panel_select(emp_index: int, page: int, total_pages: int, rows, selected: set[int]):
+    kb = InlineKeyboardBuilder()
+    for r in rows:
+        mark = "☑️" if r["id"] in selected else "⬜"
+        kb.button(text=f"{mark} ID {r['id']}", callback_data=f"ptog:{emp_index}:{page}:{r['id']}")
+    nav = 0
+    if page > 0:
+        kb.button(text="⬅️", callback_data=f"psel:{emp_index}:{page-1}")
+        nav += 1
+    if page < total_pages - 1:
+        kb.button(text="➡️", callback_data=f"psel:{emp_index}:{page+1}")
+        nav += 1
+    n = len(selected)
+    kb.button(text=f"✅ Танланганларни ёпиш ({n})", callback_data=f"pbulk:{emp_index}:{page}:DONE")
+    kb.button(text=f"❌ Танланганларни рад этиш ({n})", callback_data=f"pbulk:{emp_index}:{page}:REJECT")
+    for days in BULK_OLDER_DAYS:
+        kb.button(text=f"⏳ {days} кундан эски NEW — рад", callback_data=f"pold:{emp_index}:{days}")
+    kb.button(text="🔙 Орқага", callback_data=f"panel_emp:{emp_index}:0")
+    sizes = [1] * len(rows) + ([nav] if nav else []) + [1, 1] + [1] * len(BULK_OLDER_DAYS) + [1]
+    kb.adjust(*sizes)
+    return kb.as_markup()
+
+def kb_confirm_older(emp_index: int, days: int):
+    kb = InlineKeyboardBuilder()
+    kb.button(text="✅ Ҳа, рад этилсин", callback_data=f"pold_ok:{emp_index}:{days}")
+    kb.button(text="🔙 Бекор қилиш", callback_data=f"psel:{emp_index}:0")
+    kb.adjust(1)
     return kb.as_markup()
 
 
@@ -328,6 +722,66 @@ class Draft:
 
 DRAFTS: dict[int, Draft] = {}  # user_id -> Draft
 
+@dataclass
+class PendingDupe:
+    employee: str
+    text: str
+    match_cid: int
+
+PENDING_DUPES: dict[int, PendingDupe] = {}  # user_id -> тасдиқ кутаётган ўхшаш шикоят
+
+@dataclass
+class AlbumBuffer:
+    user_id: int
+    from_name: str
+    media: list[tuple[str, str]]
+    caption: str
+    last: float
+
+ALBUMS: dict[str, AlbumBuffer] = {}  # media_group_id -> йиғилаётган альбом
+
+PANEL_SELECTION: dict[int, tuple[int, set[int]]] = {}  # admin_id -> (emp_index, танланган ID лар)
+
+# Ходим бўйича охирги шикоятлар (DEDUP_WINDOW_HOURS) — boot да SQLite дан қайта қурилади
+DEDUP = dedup.RecentIndex(window_secs=dedup.DEDUP_WINDOW_HOURS * 3600)
+
+def complaint_ts(created_at: str) -> float:
+    return datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").replace(tzinfo=TZ).timestamp()
+
+def rebuild_dedup_index() -> int:
+    if DEDUP.window <= 0:
+        return 0
+    since = (datetime.now(TZ) - timedelta(seconds=DEDUP.window)).strftime("%Y-%m-%d %H:%M:%S")
+    con = db()
+    rows = con.execute(
+        "SELECT id, employee, text, created_at FROM complaints_all "
+        "WHERE created_at >= ? AND status = 'NEW' ORDER BY id",
+        (since,),
+    ).fetchall()
+    con.close()
+    for r in rows:
+        DEDUP.add(r["employee"], r["id"], r["text"], complaint_ts(r["created_at"]))
+    return len(rows)
+
+# Очиқ шикоятлар SLA муддатлари — boot да (status, created_at) индекси бўйича қайта қурилади
+SLA = sla.EscalationEngine()
+
+def rebuild_sla() -> int:
+    if not SLA.steps:
+        return 0
+    con = db()
+    rows = con.execute("""
+        SELECT c.id, c.created_at, COALESCE(s.level, 0) AS level
+        FROM complaints c LEFT JOIN sla_escalations s ON s.complaint_id = c.id
+        WHERE c.status = 'NEW'
+        ORDER BY c.created_at
+    """).fetchall()
+    con.close()
+    return SLA.rebuild([(r["id"], complaint_ts(r["created_at"]), r["level"]) for r in rows])
+
+# Бўлим гуруҳларига юбориш — ҳар бўлимнинг ўз лимити (DEPT_SEND_PER_MIN), битта бўлим тўлқини бошқасини кутдирмайди
+OUTBOX = outbox.Outbox()
+
 
 # ===================== Bot setup =====================
 rt = Router()
@@ -339,6 +793,11 @@ bot = Bot(
 dp = Dispatcher()
 dp.include_router(rt)
 
+# Битта фойдаланувчи юзлаб хабар билан Telegram лимитимизни еб қўймасин
+antiflood = AntiFloodMiddleware(is_admin=is_admin)
+dp.message.outer_middleware(antiflood)
+dp.callback_query.outer_middleware(antiflood)
+
 
 # ===================== Commands =====================
 @rt.message(Command("start"))
@@ -350,7 +809,9 @@ async def cmd_start(m: Message):
         "Шикоят қолдириш учун аввал ходимни танланг, кейин матн ёзинг.\n\n"
         "📌 Командалар:\n"
         "• /panel — админ панель\n"
-        "• /stats — статистика\n"
+        "• /stats [YYYY-MM-DD] — статистика (ўша кун ҳолатига)\n"
+        "• /reopen ID — шикоятни қайта очиш (фақат админ)\n"
+        "• /export [from] [to] [ходим] [status] [csv|xlsx] — экспорт\n"
         "• /reset CODE — тозалаш (фақат админ)\n\n"
         "Энг аввало ходимни танлаймиз 👇"
     )
@@ -360,7 +821,7 @@ async def cmd_start(m: Message):
 async def cmd_panel(m: Message):
     if not is_admin(m.from_user.id):
         return await m.answer("Бу бўлим фақат раҳбарият учун.")
-    await m.answer("📌 <b>Админ панель</b>\nҚайси ходим бўйича шикоятларни кўрамиз?", reply_markup=kb_admin_panel_employees())
+    await m.answer("📌 <b>Админ панель</b>\nҚайси ходим бўйича шикоятларни кўрамиз?", reply_markup=kb_admin_panel_employees(m.from_user.id))
 
 @rt.message(Command("admin"))
 async def cmd_admin_alias(m: Message):
@@ -371,19 +832,102 @@ async def cmd_admin_alias(m: Message):
 async def cmd_stats(m: Message):
     if not is_admin(m.from_user.id):
         return await m.answer("Бу бўлим фақат раҳбарият учун.")
-    total, new, done, rej = stats()
+    parts = (m.text or "").split(maxsplit=1)
+    as_of = None
+    if len(parts) > 1:
+        # /stats 2026-10-01 ёки /stats 2026-10-01 18:00 — ўша вақтдаги ҳолат
+        raw = parts[1].strip()
+        try:
+            at = datetime.fromisoformat(raw if " " in raw else raw + " 23:59:59")
+        except ValueError:
+            return await m.answer("Формат: <code>/stats</code> ёки <code>/stats YYYY-MM-DD [HH:MM]</code>")
+        as_of = at.strftime("%Y-%m-%d %H:%M:%S")
+    # бўлим админи — фақат ўз бўлим(лар)и; бош админ — жами ва бўлимлар кесимида
+    depts = DEPTS.for_admin(m.from_user.id)
+    scoped = not is_super_admin(m.from_user.id)
+    eids = {employee_key(e) for e in DEPTS.employees_for(m.from_user.id)} if scoped else None
+    total, new, done, rej = stats_as_of(as_of, eids) if as_of else stats(eids)
+    title = f"📊 <b>Статистика</b> ({as_of} ҳолатига)" if as_of else "📊 <b>Статистика</b>"
+    if scoped:
+        title += "\n🏢 " + ", ".join(escape_html(d.title) for d in depts)
+    per_dept = ""
+    if not scoped and not DEPTS.single:
+        for d in depts:
+            d_eids = {employee_key(e) for e in d.employees}
+            t, n, dn, rj = stats_as_of(as_of, d_eids) if as_of else stats(d_eids)
+            per_dept += f"\n🏢 {escape_html(d.title)}: <b>{t}</b> | 🆕 {n} | ✅ {dn} | ❌ {rj}"
     await m.answer(
-        "📊 <b>Статистика</b>\n"
+        f"{title}\n"
         f"Жами: <b>{total}</b>\n"
         f"Янги: <b>{new}</b>\n"
         f"Бартараф этилди: <b>{done}</b>\n"
         f"Рад этилди: <b>{rej}</b>\n"
-        f"\nТест режим: <b>{'ON' if TEST_MODE else 'OFF'}</b>"
+        f"{per_dept}"
+        f"\nТест режим: <b>{'ON' if TEST_MODE else 'OFF'}</b>\n"
+        f"<code>{escape_html(persistence_status_line(DB_PATH, ARCHIVE_PATH))}</code>"
     )
 
+@rt.message(Command("reopen"))
+async def cmd_reopen(m: Message):
+    if not is_admin(m.from_user.id):
+        return await m.answer("Бу бўлим фақат раҳбарият учун.")
+    parts = (m.text or "").split()
+    if len(parts) < 2 or not parts[1].isdigit():
+        return await m.answer("Формат: <code>/reopen ID</code>")
+    cid = int(parts[1])
+    row = get_complaint(cid)
+    if row and not can_manage(m.from_user.id, row["employee"]):
+        return await m.answer("Бу шикоят бошқа бўлимга тегишли.")
+    if not reopen_complaint(cid, m.from_user.id):
+        return await m.answer("Топилмади, аллақачон очиқ ёки архивда.")
+
+    row = get_complaint(cid)
+    SLA.add(cid, time.time())
+    if row["group_chat_id"] and row["group_message_id"]:
+        try:
+            await bot.edit_message_text(
+                admin_card(row) + "\n\n🔄 <b>Қайта очилди</b>",
+                chat_id=row["group_chat_id"],
+                message_id=row["group_message_id"],
+                reply_markup=kb_admin_actions(cid),
+            )
+        except Exception:
+            pass
+    schedule_hub_sync(row["employee"])
+    await m.answer(f"🔄 ID <b>{cid}</b> қайта очилди.")
+
+@rt.message(Command("metrics"))
+async def cmd_metrics(m: Message):
+    if not is_admin(m.from_user.id):
+        return await m.answer("Бу бўлим фақат раҳбарият учун.")
+    # фон вазифалар (hub sync, карточкалар) — shutdown да drain шуларни кутади
+    metrics.set_gauge("bg_tasks", pending_count())
+    await m.answer(f"📈 <b>Metrics</b>\n<pre>{escape_html(metrics.render())}</pre>")
+
+@rt.message(Command("hub_backfill"))
+async def cmd_hub_backfill(m: Message):
+    if not is_super_admin(m.from_user.id):
+        return await m.answer("Бу бўлим фақат раҳбарият учун.")
+    parts = (m.text or "").split(maxsplit=1)
+    try:
+        date_from, date_to = hub_sync.parse_range(parts[1] if len(parts) > 1 else "", datetime.now(TZ).date())
+    except ValueError as e:
+        return await m.answer(f"❌ {escape_html(str(e))}\nФормат: <code>/hub_backfill 2026-09-01 2026-09-30</code>")
+    chat_id = m.chat.id
+
+    async def notify(text: str):
+        try:
+            await bot.send_message(chat_id, text)
+        except Exception:
+            pass
+
+    if not HUB.start(date_from, date_to, notify):
+        return await m.answer("⏳ Hub тузатиш аллақачон ишлаяпти.")
+    await m.answer(f"⏳ Hub: {date_from}..{date_to} — ўзгарган кунлар юборилмоқда…")
+
 @rt.message(Command("reset"))
 async def cmd_reset(m: Message):
-    if not is_admin(m.from_user.id):
+    if not is_super_admin(m.from_user.id):
         return await m.answer("Бу бўлим фақат раҳбарият учун.")
     parts = (m.text or "").split(maxsplit=1)
     if len(parts) < 2:
@@ -392,8 +936,61 @@ async def cmd_reset(m: Message):
     if code != RESET_CODE:
         return await m.answer("❌ Код нотўғри. (Reset рад этилди)")
     reset_all()
+    DEDUP.clear()
+    SLA.clear()
+    await asyncio.to_thread(sqlite_maintenance, DB_PATH, "vacuum")
     await m.answer("✅ База тозаланди. Энди ҳаммаси 0 дан бошланади.")
 
+@rt.message(Command("export"))
+async def cmd_export(m: Message):
+    if not is_admin(m.from_user.id):
+        return await m.answer("Бу бўлим фақат раҳбарият учун.")
+    parts = (m.text or "").split(maxsplit=1)
+    try:
+        flt, fmt = export_data.parse_export_args(
+            parts[1] if len(parts) > 1 else "", DEPTS.employees_for(m.from_user.id)
+        )
+    except ValueError as e:
+        return await m.answer(f"❌ {escape_html(str(e))}")
+    if flt.employee is None and not is_super_admin(m.from_user.id):
+        # бўлим админи — бир ходим бўйича (ходим рақами ўз бўлими рўйхатида)
+        return await m.answer("Ходимни кўрсатинг: <code>/export [from] [to] ходим</code>")
+
+    await m.answer("⏳ Экспорт тайёрланмоқда…")
+    out_dir = tempfile.mkdtemp(prefix="export_")
+    base = export_data.export_base_name(flt)
+    try:
+        if fmt == "xlsx":
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            loop = asyncio.get_running_loop()
+            # fork эмас: жараёнда thread лар бор (write queue, to_thread) — бола қулф ушланган ҳолда қотиши мумкин
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                files = await loop.run_in_executor(
+                    pool, export_data.write_xlsx_parts, DB_PATH, ARCHIVE_PATH, flt, out_dir, base
+                )
+        else:
+            files = await asyncio.to_thread(
+                export_data.write_csv_parts,
+                export_data.iter_rows(DB_PATH, ARCHIVE_PATH, flt),
+                out_dir,
+                base,
+            )
+        total = sum(n for _, n in files)
+        for i, (path, n) in enumerate(files, start=1):
+            caption = f"📤 Экспорт: <b>{total}</b> қатор"
+            if len(files) > 1:
+                caption += f" — қисм {i}/{len(files)} ({n})"
+            await bot.send_document(m.chat.id, FSInputFile(path), caption=caption)
+    except ImportError:
+        await m.answer("❗ XLSX учун <code>openpyxl</code> ўрнатилмаган. CSV ишлатинг.")
+    except Exception:
+        log.exception("Export xato")
+        await m.answer("❌ Экспортда хато.")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
 
 # ===================== Callbacks: employee choose =====================
 @rt.callback_query(F.data.startswith("emp:"))
@@ -421,21 +1018,179 @@ async def any_text(m: Message):
     if len(text) < 3:
         return await m.answer("Матн жуда қисқа. Илтимос, аниқроқ ёзинг.")
 
-    from_name = fmt_user_name(m)
-    cid = add_complaint(d.employee, m.from_user.id, from_name, text)
+    match = DEDUP.find(d.employee, text, time.time())
+    if match:
+        cid0, kind = match
+        row0 = get_complaint(cid0)
+        if row0 and row0["status"] == "NEW":
+            if kind == "exact":
+                metrics.inc("dedup_exact")
+                DRAFTS.pop(m.from_user.id, None)
+                return await m.answer(
+                    f"ℹ️ Бу шикоят аллақачон қабул қилинган (ID <b>{cid0}</b>). Раҳбарият кўриб чиқяпти."
+                )
+            metrics.inc("dedup_near")
+            PENDING_DUPES[m.from_user.id] = PendingDupe(d.employee, text, cid0)
+            DRAFTS.pop(m.from_user.id, None)
+            preview = (row0["text"] or "").strip().replace("\n", " ")
+            if len(preview) > 120:
+                preview = preview[:120] + "…"
+            return await m.answer(
+                f"🔁 Шунга ўхшаш шикоят бор (ID <b>{cid0}</b>):\n<i>{escape_html(preview)}</i>\n\n"
+                "Матнингизни унга қўшайликми ёки янги шикоят сифатида юборайликми?",
+                reply_markup=kb_dupe_confirm(),
+            )
+        DEDUP.remove(cid0)
+
+    await submit_complaint(m.from_user.id, fmt_user_name(m), d.employee, text)
+    await m.answer("✅ Қабул қилинди. Раҳбарият кўриб чиқади.")
+    DRAFTS.pop(m.from_user.id, None)
+
+async def submit_complaint(
+    user_id: int, from_name: str, employee: str, text: str, media: list[tuple[str, str]] = ()
+) -> int:
+    cid = await queue_complaint(employee, user_id, from_name, text, media)
+    DEDUP.add(employee, cid, text, time.time())
+    SLA.add(cid, time.time())
 
+    schedule_hub_sync(employee)
+    schedule_complaint_card(cid, media)
+    return cid
+
+async def post_complaint_card(cid: int, media: list[tuple[str, str]] = ()):
+    """Бўлим навбати орқали: аввал илова, кейин карточка; group_message_id юборилгандан кейин ёзилади."""
     row = get_complaint(cid)
-    msg = await bot.send_message(
-        chat_id=GROUP_ID,
+    dept = DEPTS.for_employee(row["employee"])
+    media_msg_id = await send_complaint_media(cid, media, dept) if media else None
+    msg = await OUTBOX.send(dept.key, lambda: bot.send_message(
+        chat_id=dept.group_id,
         text=admin_card(row),
         reply_markup=kb_admin_actions(cid),
-    )
-    set_group_message(cid, GROUP_ID, msg.message_id)
+        reply_to_message_id=media_msg_id,
+    ))
+    await queue_group_message(cid, dept.group_id, msg.message_id)
 
-    await sync_employee_hub(d.employee)
+def schedule_complaint_card(cid: int, media: list[tuple[str, str]] = ()):
+    """Шикоятчи кутмайди. Улгурмаса group_message_id бўш қолади — кейинги boot қайта юборади."""
+    spawn(post_complaint_card(cid, media), name=f"card:{cid}", persist=lambda: None)
 
-    await m.answer("✅ Қабул қилинди. Раҳбарият кўриб чиқади.")
-    DRAFTS.pop(m.from_user.id, None)
+def unposted_cards() -> list[tuple[int, list[tuple[str, str]]]]:
+    """Гуруҳга чиқмаган NEW шикоятлар (навбатда қолиб кетган ёки юбориш хато бўлган)."""
+    con = db()
+    rows = con.execute(
+        "SELECT id FROM complaints WHERE status = 'NEW' AND group_message_id IS NULL ORDER BY id"
+    ).fetchall()
+    out = []
+    for r in rows:
+        media = con.execute(
+            "SELECT kind, file_id FROM complaint_media WHERE complaint_id = ? ORDER BY id", (r["id"],)
+        ).fetchall()
+        out.append((r["id"], [(m["kind"], m["file_id"]) for m in media]))
+    con.close()
+    return out
+
+# ===================== Receive complaint media =====================
+def message_media(m: Message) -> tuple[str, str] | None:
+    if m.photo:
+        return "photo", m.photo[-1].file_id  # энг катта ўлчам
+    if m.document:
+        return "document", m.document.file_id
+    if m.voice:
+        return "voice", m.voice.file_id
+    return None
+
+async def send_complaint_media(cid: int, media: list[tuple[str, str]], dept: departments.Department) -> int | None:
+    """Бўлим гуруҳига file_id бўйича: битта файл — битта хабар, альбом — битта send_media_group."""
+    caption = f"📎 ID {cid}"
+    try:
+        if len(media) == 1:
+            kind, file_id = media[0]
+            send = {"photo": bot.send_photo, "document": bot.send_document, "voice": bot.send_voice}[kind]
+            msg = await OUTBOX.send(dept.key, lambda: send(dept.group_id, file_id, caption=caption))
+            return msg.message_id
+        first = None
+        # Telegram альбомда расм ва ҳужжатни аралаштирмайди
+        for kind in dict.fromkeys(k for k, _ in media):
+            items = [
+                (InputMediaPhoto if kind == "photo" else InputMediaDocument)(
+                    media=file_id, caption=caption if i == 0 else None
+                )
+                for i, (_, file_id) in enumerate(x for x in media if x[0] == kind)
+            ]
+            for j in range(0, len(items), 10):
+                part = items[j:j + 10]
+                msgs = await OUTBOX.send(dept.key, lambda: bot.send_media_group(dept.group_id, part))
+                first = first or msgs[0].message_id
+        return first
+    except Exception as e:
+        log.warning("Media send failed for %s: %r", cid, e)
+        return None
+
+async def accept_media(user_id: int, from_name: str, media: list[tuple[str, str]], caption: str):
+    d = DRAFTS.get(user_id)
+    if not d:
+        return await bot.send_message(user_id, "Ходимни танланг 👇", reply_markup=kb_employee_select())
+    text = caption or f"📎 {len(media)} та илова"
+    await submit_complaint(user_id, from_name, d.employee, text, media)
+    metrics.inc("media_complaints")
+    await bot.send_message(user_id, "✅ Қабул қилинди. Раҳбарият кўриб чиқади.")
+    DRAFTS.pop(user_id, None)
+
+async def flush_album(group_id: str):
+    while True:
+        left = ALBUMS[group_id].last + ALBUM_WAIT - time.monotonic()
+        if left <= 0:
+            break
+        await asyncio.sleep(left)
+    buf = ALBUMS.pop(group_id)
+    await accept_media(buf.user_id, buf.from_name, buf.media, buf.caption)
+
+@rt.message(F.photo | F.document | F.voice, F.chat.type == "private")
+async def any_media(m: Message):
+    if not m.from_user:
+        return
+    item = message_media(m)
+    caption = (m.caption or "").strip()
+    if not m.media_group_id:
+        return await accept_media(m.from_user.id, fmt_user_name(m), [item], caption)
+
+    buf = ALBUMS.get(m.media_group_id)
+    if buf is None:
+        buf = ALBUMS[m.media_group_id] = AlbumBuffer(
+            m.from_user.id, fmt_user_name(m), [], caption, time.monotonic()
+        )
+        spawn(flush_album(m.media_group_id), name=f"album:{m.media_group_id}")
+    buf.media.append(item)
+    buf.caption = buf.caption or caption
+    buf.last = time.monotonic()
+
+@rt.callback_query(F.data.startswith("dupe:"))
+async def cb_dupe(c: CallbackQuery):
+    p = PENDING_DUPES.pop(c.from_user.id, None)
+    if not p:
+        return await c.answer("Эскирган. Қайта юборинг.", show_alert=True)
+    from_name = (c.from_user.full_name or "").strip() or "Unknown"
+
+    if c.data == "dupe:merge" and append_complaint_text(p.match_cid, p.text, from_name):
+        DEDUP.add(p.employee, p.match_cid, p.text, time.time())
+        row = get_complaint(p.match_cid)
+        if row["group_chat_id"] and row["group_message_id"]:
+            try:
+                await bot.edit_message_text(
+                    admin_card(row),
+                    chat_id=row["group_chat_id"],
+                    message_id=row["group_message_id"],
+                    reply_markup=kb_admin_actions(p.match_cid),
+                )
+            except Exception:
+                pass
+        metrics.inc("dedup_merged")
+        await c.message.edit_text(f"✅ ID <b>{p.match_cid}</b> шикоятига қўшилди.")
+    else:
+        # "янги" ёки мавжуди аллақачон ҳал қилинган — алоҳида шикоят
+        await submit_complaint(c.from_user.id, from_name, p.employee, p.text)
+        await c.message.edit_text("✅ Қабул қилинди. Раҳбарият кўриб чиқади.")
+    await c.answer()
 
 # ===================== Admin actions: DONE / REJECT =====================
 async def notify_user_reject(user_id: int):
@@ -459,10 +1214,14 @@ async def cb_done(c: CallbackQuery):
     if not row:
         return await c.answer("Топилмади", show_alert=True)
 
+    if not can_manage(c.from_user.id, row["employee"]):
+        return await c.answer("Рухсат йўқ", show_alert=True)
     if row["status"] != "NEW":
         return await c.answer("Аллақачон қарор қилинган", show_alert=True)
 
     update_status(cid, "DONE", c.from_user.id, "")
+    DEDUP.remove(cid)
+    SLA.discard(cid)
     row2 = get_complaint(cid)
 
     # group message edit
@@ -471,7 +1230,7 @@ async def cb_done(c: CallbackQuery):
     except Exception:
         pass
 
-    await sync_employee_hub(row2["employee"])
+    schedule_hub_sync(row2["employee"])
     await c.answer("OK ✅")
 
 @rt.callback_query(F.data.startswith("reject:"))
@@ -483,10 +1242,14 @@ async def cb_reject(c: CallbackQuery):
     if not row:
         return await c.answer("Топилмади", show_alert=True)
 
+    if not can_manage(c.from_user.id, row["employee"]):
+        return await c.answer("Рухсат йўқ", show_alert=True)
     if row["status"] != "NEW":
         return await c.answer("Аллақачон қарор қилинган", show_alert=True)
 
     update_status(cid, "REJECT", c.from_user.id, "")
+    DEDUP.remove(cid)
+    SLA.discard(cid)
     row2 = get_complaint(cid)
 
     # group message edit
@@ -497,7 +1260,7 @@ async def cb_reject(c: CallbackQuery):
 
     # notify user softly
     await notify_user_reject(int(row2["from_user_id"]))
-    await sync_employee_hub(row2["employee"])
+    schedule_hub_sync(row2["employee"])
     await c.answer("OK ❌")
 
 
@@ -506,7 +1269,10 @@ async def cb_reject(c: CallbackQuery):
 async def cb_panel_back(c: CallbackQuery):
     if not is_admin(c.from_user.id):
         return await c.answer("Рухсат йўқ", show_alert=True)
-    await c.message.edit_text("📌 <b>Админ панель</b>\nҚайси ходим бўйича шикоятларни кўрамиз?", reply_markup=kb_admin_panel_employees())
+    await c.message.edit_text(
+        "📌 <b>Админ панель</b>\nҚайси ходим бўйича шикоятларни кўрамиз?",
+        reply_markup=kb_admin_panel_employees(c.from_user.id),
+    )
     await c.answer()
 
 @rt.callback_query(F.data.startswith("panel_emp:"))
@@ -517,8 +1283,17 @@ async def cb_panel_emp(c: CallbackQuery):
     _, idx_s, page_s = c.data.split(":")
     emp_index = int(idx_s)
     page = int(page_s)
-    employee = EMPLOYEES[emp_index]
+    if not can_manage(c.from_user.id, EMPLOYEES[emp_index]):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    eid = employee_key(EMPLOYEES[emp_index])
+    text, markup = RENDER_CACHE.get(
+        ("panel_emp", eid, page), versions.current(eid), lambda: render_panel_page(emp_index, page)
+    )
+    await c.message.edit_text(text, reply_markup=markup)
+    await c.answer()
 
+def render_panel_page(emp_index: int, page: int):
+    employee = EMPLOYEES[emp_index]
     per_page = 5
     total = count_by_employee(employee)
     total_pages = max(1, (total + per_page - 1) // per_page)
@@ -542,13 +1317,151 @@ async def cb_panel_emp(c: CallbackQuery):
                 f"Кимдан: <code>{r['from_user_id']}</code>\n"
                 f"Мазмун: {escape_html(preview)}"
             )
+    return "\n".join(lines), kb_panel_pager(emp_index, page, total_pages)
+
+
+# ===================== Admin panel: bulk actions =====================
+DECISION_SUFFIX = {"DONE": "✅ <b>Бартараф этилди</b>", "REJECT": "❌ <b>Рад этилди</b>"}
+
+async def edit_decided_cards(rows, status: str):
+    """Гуруҳ карточкалари CARD_EDIT_INTERVAL оралиғида — flood limitга тушмаслик учун."""
+    if status == "REJECT":
+        for uid in dict.fromkeys(int(r["from_user_id"]) for r in rows):
+            await notify_user_reject(uid)
+            await asyncio.sleep(0.05)
+    for r in rows:
+        if not (r["group_chat_id"] and r["group_message_id"]):
+            continue
+        try:
+            # бўлим лимитидан — шу орада тушган янги карточкалар навбатда қолиб кетмайди
+            await OUTBOX.send(DEPTS.for_employee(r["employee"]).key, lambda: bot.edit_message_text(
+                admin_card(r) + "\n\n" + DECISION_SUFFIX[status],
+                chat_id=r["group_chat_id"],
+                message_id=r["group_message_id"],
+            ))
+        except Exception as e:
+            log.debug("Card edit %s: %r", r["id"], e)
+        await asyncio.sleep(CARD_EDIT_INTERVAL)
+
+def apply_bulk_decision(rows, status: str):
+    for r in rows:
+        DEDUP.remove(r["id"])
+        SLA.discard(r["id"])
+    for employee in dict.fromkeys(r["employee"] for r in rows):
+        schedule_hub_sync(employee)
+    if rows:
+        spawn(edit_decided_cards(rows, status), name=f"bulk_cards:{status}:{len(rows)}")
+    metrics.inc(f"bulk_{status.lower()}", len(rows))
+
+async def render_panel_select(c: CallbackQuery, emp_index: int, page: int, note: str = ""):
+    employee = EMPLOYEES[emp_index]
+    sel = PANEL_SELECTION.get(c.from_user.id)
+    if not sel or sel[0] != emp_index:
+        sel = PANEL_SELECTION[c.from_user.id] = (emp_index, set())
+
+    per_page = 8
+    total = count_by_employee(employee, status="NEW")
+    total_pages = max(1, (total + per_page - 1) // per_page)
+    page = max(0, min(page, total_pages - 1))
+    rows = list_by_employee(employee, status="NEW", limit=per_page, offset=page * per_page)
+
+    lines = [f"☑️ <b>{employee}</b> — кўп танлаш\nNEW: <b>{total}</b> | Танланган: <b>{len(sel[1])}</b>\n"]
+    if note:
+        lines.append(note + "\n")
+    if not rows:
+        lines.append("Очиқ шикоят йўқ.")
+    for r in rows:
+        created = datetime.fromisoformat(r["created_at"]).astimezone(TZ).strftime("%d.%m %H:%M")
+        preview = (r["text"] or "").strip().replace("\n", " ")
+        if len(preview) > 60:
+            preview = preview[:60] + "…"
+        lines.append(f"<b>ID {r['id']}</b> | <i>{created}</i> — {escape_html(preview)}")
 
     await c.message.edit_text(
         "\n".join(lines),
-        reply_markup=kb_panel_pager(emp_index, page, total_pages),
+        reply_markup=kb_panel_select(emp_index, page, total_pages, rows, sel[1]),
     )
+
+@rt.callback_query(F.data.startswith("psel:"))
+async def cb_panel_select(c: CallbackQuery):
+    if not is_admin(c.from_user.id):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    _, idx_s, page_s = c.data.split(":")
+    if not can_manage(c.from_user.id, EMPLOYEES[int(idx_s)]):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    await render_panel_select(c, int(idx_s), int(page_s))
     await c.answer()
 
+@rt.callback_query(F.data.startswith("ptog:"))
+async def cb_panel_toggle(c: CallbackQuery):
+    if not is_admin(c.from_user.id):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    _, idx_s, page_s, cid_s = c.data.split(":")
+    emp_index, cid = int(idx_s), int(cid_s)
+    if not can_manage(c.from_user.id, EMPLOYEES[emp_index]):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    sel = PANEL_SELECTION.get(c.from_user.id)
+    if not sel or sel[0] != emp_index:
+        sel = PANEL_SELECTION[c.from_user.id] = (emp_index, set())
+    if cid not in sel[1]:
+        # id callback дан — фақат шу ходимнинг очиқ шикояти танланади
+        row = get_complaint(cid)
+        if not row or row["employee"] != EMPLOYEES[emp_index] or row["status"] != "NEW":
+            return await c.answer("Топилмади", show_alert=True)
+    sel[1].symmetric_difference_update({cid})
+    await render_panel_select(c, emp_index, int(page_s))
+    await c.answer()
+
+@rt.callback_query(F.data.startswith("pbulk:"))
+async def cb_panel_bulk(c: CallbackQuery):
+    if not is_admin(c.from_user.id):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    _, idx_s, page_s, status = c.data.split(":")
+    emp_index = int(idx_s)
+    if not can_manage(c.from_user.id, EMPLOYEES[emp_index]):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    sel = PANEL_SELECTION.get(c.from_user.id)
+    if status not in DECISION_SUFFIX or not sel or sel[0] != emp_index or not sel[1]:
+        return await c.answer("Ҳеч нарса танланмаган", show_alert=True)
+
+    rows = bulk_update_status(EMPLOYEES[emp_index], sorted(sel[1]), status, c.from_user.id)
+    sel[1].clear()
+    apply_bulk_decision(rows, status)
+    await render_panel_select(c, emp_index, int(page_s), note=f"{DECISION_SUFFIX[status]}: <b>{len(rows)}</b> та")
+    await c.answer(f"OK: {len(rows)}")
+
+@rt.callback_query(F.data.startswith("pold:"))
+async def cb_panel_older(c: CallbackQuery):
+    if not is_admin(c.from_user.id):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    _, idx_s, days_s = c.data.split(":")
+    emp_index, days = int(idx_s), int(days_s)
+    if not can_manage(c.from_user.id, EMPLOYEES[emp_index]):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    cutoff = (datetime.now(TZ) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    n = count_new_older(EMPLOYEES[emp_index], cutoff)
+    if not n:
+        return await c.answer(f"{days} кундан эски NEW йўқ", show_alert=True)
+    await c.message.edit_text(
+        f"⏳ <b>{EMPLOYEES[emp_index]}</b>: {days} кундан эски <b>{n}</b> та NEW шикоят рад этилади.\nДавом этамизми?",
+        reply_markup=kb_confirm_older(emp_index, days),
+    )
+    await c.answer()
+
+@rt.callback_query(F.data.startswith("pold_ok:"))
+async def cb_panel_older_ok(c: CallbackQuery):
+    if not is_admin(c.from_user.id):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    _, idx_s, days_s = c.data.split(":")
+    emp_index, days = int(idx_s), int(days_s)
+    if not can_manage(c.from_user.id, EMPLOYEES[emp_index]):
+        return await c.answer("Рухсат йўқ", show_alert=True)
+    cutoff = (datetime.now(TZ) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    rows = bulk_reject_older(EMPLOYEES[emp_index], cutoff, c.from_user.id)
+    apply_bulk_decision(rows, "REJECT")
+    await render_panel_select(c, emp_index, 0, note=f"{DECISION_SUFFIX['REJECT']}: <b>{len(rows)}</b> та")
+    await c.answer(f"OK: {len(rows)}")
+
 
 # ===================== Scheduler: 2 soat + alertlar =====================
 async def heartbeat():
@@ -561,12 +1474,184 @@ async def heartbeat():
         except Exception:
             pass
 
+async def _send_report(chat_id: int, text: str, dept_key: str | None = None):
+    try:
+        if dept_key:
+            await OUTBOX.send(dept_key, lambda: bot.send_message(chat_id, text))
+        else:
+            await bot.send_message(chat_id, text)
+    except Exception as e:
+        log.warning("Report send failed for %s: %r", chat_id, e)
+
+async def broadcast_report(build):
+    """
+    Ҳар бўлим гуруҳи ва админларига — ўз ходимлари бўйича; бош админларга — умумий ҳисобот.
+    build(scope) -> str, scope — ходим номлари (None — ҳаммаси).
+    """
+    if DEPTS.single:
+        d = DEPTS.departments[0]
+        text = await asyncio.to_thread(build, None)
+        await _send_report(d.group_id, text, d.key)
+        for chat_id in sorted(ADMIN_IDS | d.admin_ids):
+            await _send_report(chat_id, text)
+        return
+    for d in DEPTS.departments:
+        text = f"🏢 <b>{escape_html(d.title)}</b>\n" + await asyncio.to_thread(build, set(d.employees))
+        await _send_report(d.group_id, text, d.key)
+        for chat_id in sorted(d.admin_ids - ADMIN_IDS):
+            await _send_report(chat_id, text)
+    text = await asyncio.to_thread(build, None)
+    for chat_id in sorted(ADMIN_IDS):
+        await _send_report(chat_id, text)
+
+async def sla_notify(due: list[tuple[int, int, float]]):
+    """Муддати ўтган очиқ шикоятлар — битта рўйхат; юборилган босқич SQLite га ёзилади."""
+    con = db()
+    con.executemany(
+        """
+        INSERT INTO sla_escalations(complaint_id, level) VALUES(?, ?)
+        ON CONFLICT(complaint_id) DO UPDATE SET level = MAX(level, excluded.level)
+        """,
+        [(cid, level + 1) for cid, level, _ in due],
+    )
+    con.commit()
+    marks = ",".join("?" * len(due))
+    names = {
+        r["id"]: r["employee"]
+        for r in con.execute(f"SELECT id, employee FROM complaints_all WHERE id IN ({marks})", [d[0] for d in due])
+    }
+    con.close()
+
+    now = time.time()
+    by_dept: dict[str, list[str]] = {}
+    for cid, level, created_ts in sorted(due, key=lambda d: d[2]):
+        employee = names.get(cid, "?")
+        by_dept.setdefault(DEPTS.for_employee(employee).key, []).append(
+            f"ID <b>{cid}</b> | {escape_html(employee)} | ⏱ {reports.fmt_duration(now - created_ts)}"
+            + (f" | {level + 1}-босқич" if level else "")
+        )
+    for d in DEPTS.departments:
+        lines = by_dept.get(d.key)
+        if not lines:
+            continue
+        # admins режими: бўлим админлари, бўлмаса — бош админлар
+        targets = (d.group_id,) if sla.SLA_NOTIFY == "group" else tuple(sorted(d.admin_ids or ADMIN_IDS))
+        for i in range(0, len(lines), 40):
+            text = "⏰ <b>SLA: кўриб чиқилмаган шикоятлар</b>\n\n" + "\n".join(lines[i:i + 40])
+            for chat_id in targets:
+                try:
+                    if chat_id == d.group_id:
+                        await OUTBOX.send(d.key, lambda: bot.send_message(chat_id, text))
+                    else:
+                        await bot.send_message(chat_id, text)
+                except Exception as e:
+                    log.warning("SLA send failed for %s: %r", chat_id, e)
+
+def _in_scope(rows, scope: set[str] | None):
+    return rows if scope is None else [r for r in rows if r["employee"] in scope]
+
+def build_daily_report(scope: set[str] | None = None) -> str:
+    yesterday = datetime.now(TZ).date() - timedelta(days=1)
+    con = db()
+    try:
+        reports.refresh_rollups(con, yesterday)
+        rows = reports.daily_rows(con, yesterday)
+        week = reports.weekly_rows(con, yesterday)
+    finally:
+        con.close()
+    return reports.format_daily_report(yesterday, _in_scope(rows, scope), _in_scope(week, scope))
+
+def build_weekly_report(scope: set[str] | None = None) -> str:
+    yesterday = datetime.now(TZ).date() - timedelta(days=1)
+    con = db()
+    try:
+        reports.refresh_rollups(con, yesterday)
+        week = reports.weekly_rows(con, yesterday)
+    finally:
+        con.close()
+    return reports.format_weekly_report(yesterday, _in_scope(week, scope))
+
+async def daily_report():
+    try:
+        await broadcast_report(build_daily_report)
+    except Exception:
+        log.exception("Daily report xato")
+
+async def weekly_report():
+    try:
+        await broadcast_report(build_weekly_report)
+    except Exception:
+        log.exception("Weekly report xato")
+
+async def archive_old_complaints():
+    """Эски DONE/REJECT ларни кичик партиялар билан архивга кўчиради."""
+    if archive.ARCHIVE_AFTER_DAYS <= 0:
+        return
+    cutoff = (datetime.now(TZ) - timedelta(days=archive.ARCHIVE_AFTER_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+
+    def _one_batch() -> int:
+        con = db()
+        try:
+            return archive.archive_batch(con, cutoff)
+        finally:
+            con.close()
+
+    moved = 0
+    try:
+        while True:
+            n = await asyncio.to_thread(_one_batch)
+            moved += n
+            if n < archive.ARCHIVE_BATCH:
+                break
+            await asyncio.sleep(0.2)  # жонли ёзувларга йўл берамиз
+    except Exception:
+        log.exception("Archive xato")
+    if moved:
+        log.info("Archive: %s та шикоят кўчирилди (cutoff %s)", moved, cutoff)
+
+async def db_maintenance(kinds: tuple[str, ...]):
+    """Тунги техник хизмат — ҳар бир PRAGMA алоҳида, busy_timeout билан чекланган."""
+    for kind in kinds:
+        await asyncio.to_thread(sqlite_maintenance, DB_PATH, kind)
+        if kind in ("optimize", "checkpoint"):
+            await asyncio.to_thread(sqlite_maintenance, ARCHIVE_PATH, kind, f"arch_{kind}")
+
+def parse_hhmm(raw: str, default: tuple[int, int]) -> tuple[int, int]:
+    m = re.fullmatch(r"(\d{1,2}):(\d{2})", raw or "")
+    if not m or int(m.group(1)) > 23 or int(m.group(2)) > 59:
+        return default
+    return int(m.group(1)), int(m.group(2))
+
 def setup_scheduler():
+    # оғир import — polling бошлангандан кейин, фон вазифада
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
     sch = AsyncIOScheduler(timezone=TZ)
     # сен айтган “иккала соат” — 07:30 ва 19:30 (TEST_MODE да ишлатиш учун)
-    sch.add_job(lambda: asyncio.create_task(heartbeat()), "cron", hour=7, minute=30)
-    sch.add_job(lambda: asyncio.create_task(heartbeat()), "cron", hour=19, minute=30)
+    sch.add_job(lambda: spawn(heartbeat()), "cron", hour=7, minute=30)
+    sch.add_job(lambda: spawn(heartbeat()), "cron", hour=19, minute=30)
+    # раҳбарият учун: кечаги кун ва ҳафталик тренд
+    rep_h, rep_m = parse_hhmm(DAILY_REPORT_AT, (8, 0))
+    sch.add_job(lambda: spawn(daily_report()), "cron", hour=rep_h, minute=rep_m)
+    sch.add_job(
+        lambda: spawn(weekly_report()),
+        "cron", day_of_week=WEEKLY_REPORT_DAY, hour=rep_h, minute=rep_m,
+    )
+    # тунда: эски қарорлар архивга
+    sch.add_job(lambda: spawn(archive_old_complaints()), "cron", hour=3, minute=30)
+    # ҳодисалар журнали: назорат нуқталари ва эски ҳодисалар (корутина — loop да)
+    sch.add_job(compact_events, "cron", hour=3, minute=45)
+    # архивдан кейин: бўшаган саҳифаларни қайтариш, WAL ни қисқартириш, статистика
+    sch.add_job(
+        lambda: spawn(db_maintenance(("optimize", "checkpoint", "vacuum"))),
+        "cron", hour=4, minute=0,
+    )
+    sch.add_job(lambda: spawn(db_maintenance(("quick_check",))), "cron", hour=4, minute=20)
+    # hub: рад этилган/ўтказиб юборилган кунларни тузатиш
+    rec_h, rec_m = parse_hhmm(hub_sync.HUB_RECONCILE_AT, (2, 30))
+    sch.add_job(hub_reconcile_nightly, "cron", hour=rec_h, minute=rec_m)
     sch.start()
+    return sch
 
 
 # ===================== Commands menu =====================
@@ -576,7 +1661,11 @@ async def set_commands():
         BotCommand(command="start", description="Ботни ишга тушириш / ходим танлаш"),
         BotCommand(command="panel", description="Админ панель (ходимлар бўйича)"),
         BotCommand(command="stats", description="Статистика"),
+        BotCommand(command="reopen", description="Шикоятни қайта очиш (фақат админ)"),
         BotCommand(command="reset", description="Тозалаш (фақат админ)"),
+        BotCommand(command="export", description="CSV/XLSX экспорт (фақат админ)"),
+        BotCommand(command="metrics", description="Ички метрикалар (фақат админ)"),
+        BotCommand(command="hub_backfill", description="Hub ни саналар бўйича тузатиш (фақат админ)"),
         BotCommand(command="whoami", description="ID ва admin текшириш"),
         BotCommand(command="factory_reset", description="Тўлиқ reset + restart (фақат админ)"),
     ]
@@ -596,6 +1685,7 @@ async def cmd_whoami(m: Message):
         f"ID: <code>{m.from_user.id}</code>\n"
         f"Ism: <b>{escape_html(m.from_user.full_name or 'Unknown')}</b>\n"
         f"Admin: <b>{'YES' if is_admin(m.from_user.id) else 'NO'}</b>\n"
+        f"Бўлим: <b>{escape_html(', '.join(d.title for d in DEPTS.for_admin(m.from_user.id)) or '—')}</b>\n"
         f"ADMIN_IDS: <code>{', '.join(str(x) for x in sorted(ADMIN_IDS))}</code>"
     )
 
@@ -620,7 +1710,7 @@ def _safe_remove_db_files(db_path: str) -> int:
 # ===================== /factory_reset =====================
 @rt.message(Command("factory_reset"))
 async def cmd_factory_reset(m: Message):
-    if not m.from_user or not is_admin(m.from_user.id):
+    if not m.from_user or not is_super_admin(m.from_user.id):
         return
 
     parts = (m.text or "").split(maxsplit=1)
@@ -635,33 +1725,266 @@ async def cmd_factory_reset(m: Message):
     if code != FACTORY_RESET_CODE:
         return await m.answer("❌ Код нотўғри.")
 
-    removed = _safe_remove_db_files(DB_PATH)
+    def _remove_all():
+        removed = _safe_remove_db_files(DB_PATH) + _safe_remove_db_files(ARCHIVE_PATH)
+        log.warning("Factory reset: %s та DB файл ўчирилди", removed)
 
     await m.answer(
-        "✅ <b>Factory Reset</b> бажарилди.\n"
-        f"🗑 Ўчирилди: <b>{removed}</b> та DB файл.\n"
+        "✅ <b>Factory Reset</b> қабул қилинди.\n"
+        "🗑 Фон ишлар тугагач DB файллар ўчирилади.\n"
         "♻️ Бот қайта ишга тушяпти..."
     )
 
-    await asyncio.sleep(0.6)
-    raise SystemExit("FACTORY_RESET triggered")
+    # DB ни фон ишлар, WAL checkpoint ва lease бўшатилгандан кейин ўчирамиз
+    shutdown.after_exit(_remove_all)
+    shutdown.request("FACTORY_RESET triggered", exit_code=1)
 
 
 # ===================== Main =====================
-async def main():
-    log.info(persistence_status_line(DB_PATH))
-    init_db()
+class BootTimer:
+    """Ишга тушиш фазалари — ҳар бири лог қилинади, регрессия кўриниб туради."""
+
+    def __init__(self, t0: float):
+        self.t0 = t0
+        self.last = t0
+        self.phases: list[tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        now = time.monotonic()
+        ms = (now - self.last) * 1000
+        self.phases.append((phase, ms))
+        self.last = now
+        log.info("Boot: %s %.0f ms (жами %.0f ms)", phase, ms, (now - self.t0) * 1000)
+
+    def summary(self) -> str:
+        return " · ".join(f"{p}={ms:.0f}ms" for p, ms in self.phases)
+
+
+shutdown = Shutdown()
+# sharder биринчи: inflight worker ичида — бажарилаётган handler ни санайди; навбатдагиларни sharder.close кутади
+sharder = shards.ChatShardMiddleware()
+dp.update.outer_middleware(sharder)
+inflight = InflightMiddleware()
+dp.update.outer_middleware(inflight)
+
+def spawn_supervised(name: str, factory, *, retries: int = 2, t0: float | None = None) -> asyncio.Task:
+    """Фон вазифа: хатони лог қилади, бир неча марта қайта уринади, давомийликни ёзади."""
+    async def _run():
+        start = time.monotonic()
+        for attempt in range(retries + 1):
+            try:
+                await factory()
+                log.info(
+                    "Boot bg: %s OK %.0f ms%s", name, (time.monotonic() - start) * 1000,
+                    f" (boot+{(time.monotonic() - t0) * 1000:.0f} ms)" if t0 else "",
+                )
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Boot bg: %s xato (urinish %s/%s)", name, attempt + 1, retries + 1)
+                await asyncio.sleep(2 ** attempt)
+
+    return spawn(_run(), name=name)
+
+async def compact_events():
+    """Тунда: кечагача кунлик назорат нуқталари, кейин EVENTS_KEEP_DAYS дан эски ҳодисалар партиялаб ўчирилади."""
+    # backfill эски at билан ҳодиса қўшади — тугамагунча нуқта ёзилмайди
+    if await asyncio.to_thread(migrations.pending_backfills, DB_PATH, ARCHIVE_PATH):
+        log.info("Events compact: backfill тугамаган — кейинги тунга")
+        return
+    today = datetime.now(TZ).date()
+    before = (today - timedelta(days=events.EVENTS_KEEP_DAYS)).isoformat()
+
+    def _checkpoint() -> int:
+        con = db()
+        try:
+            return events.checkpoint(con, today.isoformat())
+        finally:
+            con.close()
+
+    def _prune_batch() -> int:
+        con = db()
+        try:
+            return events.prune(con, before)
+        finally:
+            con.close()
+
+    pruned = 0
     try:
-        day = today_iso()
-        for emp in EMPLOYEES:
-            if employee_tg_id(emp):
-                await sync_employee_hub(emp, day_iso=day)
+        days = await asyncio.to_thread(_checkpoint)
+        while True:
+            n = await asyncio.to_thread(_prune_batch)
+            pruned += n
+            if n < events.EVENTS_PRUNE_BATCH:
+                break
+            await asyncio.sleep(0.2)  # жонли ёзувларга йўл берамиз
     except Exception:
-        log.exception("ishxona hub backfill xato")
-    setup_scheduler()
-    await set_commands()
+        log.exception("Events compact xato")
+        return
+    log.info("Events compact: %s кунлик нуқта, %s ҳодиса ўчирилди (< %s)", days, pruned, before)
+
+async def hub_reconcile_nightly():
+    # корутина — AsyncIOScheduler уни event loop да ишлатади (HUB.start loop талаб қилади)
+    today = datetime.now(TZ).date()
+    if not HUB.start(today - timedelta(days=hub_sync.HUB_RECONCILE_DAYS - 1), today):
+        log.info("Hub reconcile: олдинги иш ҳали тугамаган")
+
+async def hub_backfill_today():
+    # hub_pending qatori push muvaffaqiyatli bo'lgach o'chadi — uzilish/xatoda keyingi boot qayta yuboradi
+    day = today_iso()
+    done_today = set()
+    for emp, d in await asyncio.to_thread(list_hub_pending):
+        if await sync_employee_hub(emp, day_iso=d):
+            await asyncio.to_thread(clear_hub_pending, emp, d)
+            if d == day:
+                done_today.add(emp)
+    for emp in EMPLOYEES:
+        if emp not in done_today and employee_tg_id(emp):
+            await sync_employee_hub(emp, day_iso=day)
+
+async def graceful_drain(sch):
+    """Polling тўхтагач: scheduler, handler лар, фон вазифалар, WAL, HTTP сессия."""
+    t0 = time.monotonic()
+
+    def left() -> float:
+        return SHUTDOWN_DEADLINE - (time.monotonic() - t0)
+
+    if sch:
+        sch.shutdown(wait=False)
+    left_updates = await sharder.close(left())
+    if left_updates:
+        log.warning("Shutdown: навбатда %s та update бажарилмади", left_updates)
+    if not await inflight.wait_idle(left()):
+        log.warning("Shutdown: %s та handler тугамади", inflight.count)
+    finished, persisted, dropped = await drain(left())
+    await OUTBOX.close()
+    log.info(
+        "Shutdown: фон вазифалар — тугади %s, сақланди %s, йўқолди %s (%.0f ms)",
+        finished, persisted, dropped, (time.monotonic() - t0) * 1000,
+    )
+    await WRITES.close()
+    await asyncio.to_thread(sqlite_maintenance, DB_PATH, "checkpoint")
+    await bot.session.close()
+
+async def main():
+    shutdown.install_signals()
+    try:
+        await run_process()
+    finally:
+        shutdown.run_after_exit()
+
+async def run_process():
+    boot = BootTimer(_BOOT_T0)
+    boot.mark("imports")
+    bootstrap_persistence(DB_PATH, legacy_names=("complaints.sqlite3",), backup=False)
+
+    # Deploy пайтида эски ва янги контейнер устма-уст тушади — фақат leader polling/scheduler юритади
+    # Lease алоҳида файлда: init_db даги VACUUM/миграция асосий DB ни узоқ қулфласа ҳам узайтирилади
+    lease = LeaderLease(lease_db_path(DB_PATH), legacy_path=DB_PATH)
+    acquire = asyncio.create_task(lease.acquire())
+    stop = asyncio.create_task(shutdown.event.wait())
+    await asyncio.wait({acquire, stop}, return_when=asyncio.FIRST_COMPLETED)
+    stop.cancel()
+    if not acquire.done():
+        acquire.cancel()
+        log.info("Standby тўхтатилди: %s", shutdown.reason)
+        return
+    boot.mark("lease")
+
+    leader = asyncio.create_task(run_leader(boot))
+    lost = False
+
+    async def on_lease_lost():
+        nonlocal lost
+        lost = True
+        log.error("Leader эмасмиз — polling ва scheduler тўхтатилади")
+        # нол бўлмаган код — restart policy қайта ишга туширади, жараён standby дан бошлайди
+        shutdown.request("Leader lease йўқотилди", exit_code=1)
+        leader.cancel()
+
+    lease_task = asyncio.create_task(lease.keep_alive(on_lease_lost))
+    try:
+        await leader
+    except asyncio.CancelledError:
+        if not lost:
+            raise
+    finally:
+        lease_task.cancel()
+        await asyncio.to_thread(lease.release)
+
+async def run_leader(boot: BootTimer):
+    sch = None
+
+    # Фақат lease дан кейин: standby жонли leader остида WAL/VACUUM ва схемани ўзгартирмасин.
+    # Thread да — keep_alive шу пайт ҳам lease ни узайтиради
+    backed_up = await asyncio.to_thread(init_db)
+    log.info(persistence_status_line(DB_PATH, ARCHIVE_PATH))
+    boot.mark("db")
+
+    async def start_scheduler():
+        nonlocal sch
+        sch = setup_scheduler()
+
+    async def stop_on_shutdown():
+        await shutdown.event.wait()
+        await dp.stop_polling()
+
+    async def on_polling_started():
+        boot.mark("polling")
+        log.info("Boot summary: %s", boot.summary())
+        watchers.append(asyncio.create_task(stop_on_shutdown()))
+
+    watchers: list[asyncio.Task] = []
+
+    n = rebuild_dedup_index()
+    boot.mark(f"dedup({n})")
+    n = rebuild_sla()
+    boot.mark(f"sla({n})")
+    # polling дан олдин — янги шикоятларнинг карточкалари бу рўйхатга тушмайди
+    unposted = await asyncio.to_thread(unposted_cards)
+    for cid, media in unposted:
+        schedule_complaint_card(cid, media)
+    boot.mark(f"cards({len(unposted)})")
+    # faqat leader: versiyalar shu jarayon yozuvlari bilan oshadi
+    api_runner = await api.start(api.Source(
+        stats=lambda: dict(zip(("total", "new", "done", "reject"), map(int, stats()))),
+        employees=employee_overview,
+        complaints=complaints_page,
+        employee_id=employee_key,
+    ))
+    # чексиз цикл — drain кутмасин, watchers билан бекор қилинади
+    watchers.append(asyncio.create_task(SLA.run(sla_notify), name="sla"))
+    # узун бўлиши мумкин; ҳар партия ўз ҳолати билан commit — бекор қилинса кейинги boot да давом этади
+    watchers.append(asyncio.create_task(migrations.run_backfills(DB_PATH, ARCHIVE_PATH), name="backfill"))
+
+    # узилган /hub_backfill — hub_pushed бўйича юборилганлари ўтказиб юборилади
+    if HUB.resume():
+        boot.mark("hub_resume")
+
+    # Polling аввал; қолгани фонда — ҳеч бири handler ларга керак эмас
+    if not backed_up:
+        spawn_supervised("backup", lambda: asyncio.to_thread(startup_sqlite_backup, DB_PATH), t0=boot.t0)
+    spawn_supervised("scheduler", start_scheduler, t0=boot.t0)
+    spawn_supervised("hub_backfill", hub_backfill_today, t0=boot.t0)
+    spawn_supervised("set_commands", set_commands, t0=boot.t0)
+    dp.startup.register(on_polling_started)
     log.info("Bot started.")
-    await dp.start_polling(bot)
+    try:
+        # сигнал ва сессияни ўзимиз бошқарамиз — аввал drain, кейин ёпиш
+        # shard лар ёқилган бўлса — polling цикли навбат тўлганда кутади (backpressure)
+        await dp.start_polling(
+            bot, handle_signals=False, close_bot_session=False, handle_as_tasks=sharder.handle_as_tasks
+        )
+    finally:
+        for w in watchers:
+            w.cancel()
+        HUB.stop()
+        if api_runner:
+            await api_runner.cleanup()
+        await graceful_drain(sch)
 
 if __name__ == "__main__":
     asyncio.run(main())
+    if shutdown.exit_code:
+        raise SystemExit(shutdown.reason)
@@ -0,0 +1,137 @@
+"""Takroriy shikoyatlar — xodim bo'yicha so'nggi matnlar indeksi (aniq hash + SimHash), sirpanuvchi oyna."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from collections import deque
+
+DEDUP_WINDOW_HOURS = max(0.0, float(os.getenv("DEDUP_WINDOW_HOURS", "24")))  # 0 — o'chirilgan
+# 64 bitdan nechtasi farq qilsa ham "o'xshash" — 8 ta 8-bitli band: <= 7 farqda kamida bitta band mos
+DEDUP_MAX_DISTANCE = min(7, max(0, int(os.getenv("DEDUP_MAX_DISTANCE", "6"))))
+# Qisqa matnlarda SimHash shovqinli — faqat aniq moslik
+DEDUP_MIN_NEAR_LEN = 15
+
+_BANDS = 8
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_WS = re.compile(r"\s+")
+_PUNCT = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    s = _PUNCT.sub(" ", (text or "").casefold())
+    return _WS.sub(" ", s).strip()
+
+
+def _h64(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(norm: str) -> int:
+    """Belgi 3-gramlari bo'yicha 64-bitli SimHash."""
+    grams = [norm[i:i + 3] for i in range(max(1, len(norm) - 2))]
+    acc = [0] * 64
+    for g in grams:
+        h = _h64(g)
+        for bit in range(64):
+            acc[bit] += 1 if (h >> bit) & 1 else -1
+    out = 0
+    for bit in range(64):
+        if acc[bit] > 0:
+            out |= 1 << bit
+    return out
+
+
+class RecentIndex:
+    """
+    find: aniq hash — O(1); o'xshash — 8 ta band bucket, nomzodlar soni oyna bilan cheklangan.
+    Eskirganlar vaqt tartibidagi navbatdan olib tashlanadi.
+    """
+
+    def __init__(self, window_secs: float, max_distance: int = DEDUP_MAX_DISTANCE):
+        self.window = window_secs
+        self.max_distance = max_distance
+        self._exact: dict[tuple[str, int], int] = {}
+        self._bands: dict[tuple[str, int, int], set[int]] = {}
+        # cid -> [(employee, ts, hash, fp), ...] — birlashtirilgan matnlar ham shu cid ga
+        self._entries: dict[int, list[tuple[str, float, int, int | None]]] = {}
+        self._order: deque[tuple[float, int]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._exact.clear()
+        self._bands.clear()
+        self._entries.clear()
+        self._order.clear()
+
+    def add(self, employee: str, cid: int, text: str, ts: float) -> None:
+        if self.window <= 0:
+            return
+        norm = normalize(text)
+        if not norm:
+            return
+        h = _h64(norm)
+        fp = simhash(norm) if len(norm) >= DEDUP_MIN_NEAR_LEN else None
+        self._exact[(employee, h)] = cid
+        if fp is not None:
+            for b in range(_BANDS):
+                key = (employee, b, (fp >> (b * _BAND_BITS)) & _BAND_MASK)
+                self._bands.setdefault(key, set()).add(cid)
+        self._entries.setdefault(cid, []).append((employee, ts, h, fp))
+        self._order.append((ts, cid))
+
+    def remove(self, cid: int) -> None:
+        for employee, _, h, fp in self._entries.pop(cid, ()):
+            if self._exact.get((employee, h)) == cid:
+                del self._exact[(employee, h)]
+            if fp is None:
+                continue
+            for b in range(_BANDS):
+                key = (employee, b, (fp >> (b * _BAND_BITS)) & _BAND_MASK)
+                bucket = self._bands.get(key)
+                if bucket is not None:
+                    bucket.discard(cid)
+                    if not bucket:
+                        del self._bands[key]
+
+    def expire(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._order and self._order[0][0] < cutoff:
+            _, cid = self._order.popleft()
+            entries = self._entries.get(cid)
+            # birlashtirilgan matn keyinroq qo'shilgan bo'lsa — cid hali tirik
+            if entries and max(e[1] for e in entries) < cutoff:
+                self.remove(cid)
+
+    def find(self, employee: str, text: str, now: float) -> tuple[int, str] | None:
+        """(cid, 'exact' | 'near') yoki None."""
+        if self.window <= 0:
+            return None
+        self.expire(now)
+        norm = normalize(text)
+        if not norm:
+            return None
+        cid = self._exact.get((employee, _h64(norm)))
+        if cid is not None:
+            return cid, "exact"
+        if len(norm) < DEDUP_MIN_NEAR_LEN:
+            return None
+        fp = simhash(norm)
+        best: tuple[int, int] | None = None
+        seen: set[int] = set()
+        for b in range(_BANDS):
+            for cand in self._bands.get((employee, b, (fp >> (b * _BAND_BITS)) & _BAND_MASK), ()):
+                if cand in seen:
+                    continue
+                seen.add(cand)
+                for emp, _, _, cfp in self._entries.get(cand, ()):
+                    if emp != employee or cfp is None:
+                        continue
+                    dist = (fp ^ cfp).bit_count()
+                    if dist <= self.max_distance and (best is None or dist < best[0]):
+                        best = (dist, cand)
+        return (best[1], "near") if best else None
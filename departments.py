@@ -0,0 +1,88 @@
+"""Bo'limlar — xodim -> guruh va adminlar to'plami; bitta jarayon hamma bo'limga xizmat qiladi."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Department:
+    key: str
+    title: str
+    group_id: int
+    admin_ids: frozenset[int]
+    employees: tuple[str, ...]
+
+
+def parse_departments(raw: str, default: Department) -> tuple[Department, ...]:
+    """
+    DEPARTMENTS='[{"key": "s1", "title": "Склад 1", "group_id": -100..., "admins": [1, 2],
+                   "employees": ["A", "B"]}, ...]'
+    Bo'sh bo'lsa — bitta default bo'lim (GROUP_ID, ADMIN_IDS, EMPLOYEES). Xato — ValueError.
+    """
+    if not (raw or "").strip():
+        return (default,)
+    try:
+        items = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"DEPARTMENTS: JSON xato: {e}") from None
+    if not isinstance(items, list) or not items:
+        raise ValueError("DEPARTMENTS: bo'limlar ro'yxati bo'lishi kerak")
+
+    out: list[Department] = []
+    owner: dict[str, str] = {}
+    for i, item in enumerate(items, start=1):
+        try:
+            key = str(item["key"]).strip()
+            dept = Department(
+                key=key,
+                title=str(item.get("title") or key).strip(),
+                group_id=int(item["group_id"]),
+                admin_ids=frozenset(int(x) for x in item.get("admins") or ()),
+                employees=tuple(str(e).strip() for e in item["employees"] if str(e).strip()),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"DEPARTMENTS[{i}]: key, group_id, employees kerak ({e!r})") from None
+        if not key or any(d.key == key for d in out):
+            raise ValueError(f"DEPARTMENTS[{i}]: key bo'sh yoki takror: {key!r}")
+        for emp in dept.employees:
+            if emp in owner:
+                raise ValueError(f"DEPARTMENTS: {emp!r} ikki bo'limda: {owner[emp]}, {key}")
+            owner[emp] = key
+        out.append(dept)
+    return tuple(out)
+
+
+class Routing:
+    """Xodim -> bo'lim va admin -> bo'limlar. super_admins (ADMIN_IDS) — hamma bo'lim."""
+
+    def __init__(self, departments: tuple[Department, ...], super_admins: set[int]):
+        self.departments = departments
+        self.super_admins = frozenset(super_admins)
+        self._by_employee = {emp: d for d in departments for emp in d.employees}
+        # Umumiy ro'yxat — callback dagi indekslar shu tartibda
+        self.employees = [emp for d in departments for emp in d.employees]
+
+    @property
+    def single(self) -> bool:
+        return len(self.departments) == 1
+
+    def for_employee(self, employee: str) -> Department:
+        # ro'yxatda yo'q (eski) nom — birinchi bo'lim
+        return self._by_employee.get(employee, self.departments[0])
+
+    def for_admin(self, user_id: int) -> tuple[Department, ...]:
+        if user_id in self.super_admins:
+            return self.departments
+        return tuple(d for d in self.departments if user_id in d.admin_ids)
+
+    def is_admin(self, user_id: int) -> bool:
+        return bool(self.for_admin(user_id))
+
+    def can_manage(self, user_id: int, employee: str) -> bool:
+        return user_id in self.super_admins or user_id in self.for_employee(employee).admin_ids
+
+    def employees_for(self, user_id: int) -> list[str]:
+        allowed = {d.key for d in self.for_admin(user_id)}
+        return [emp for emp in self.employees if self._by_employee[emp].key in allowed]
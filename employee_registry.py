@@ -176,21 +176,12 @@ def migrate_sqlite_employee_row(
     Sklad DB: Pulat nomi → Tuvalov Farrux; Farrux bo'lsa tegmaydi.
     Qaytaradi: 'renamed' | 'inserted' | 'deactivated_pulat' | 'ok'.
     """
-    farrux_id = None
-    for nm in TUVALOV_DISPLAY_NAMES:
-        cursor.execute("SELECT id FROM employees WHERE name = ?", (nm,))
-        row = cursor.fetchone()
-        if row:
-            farrux_id = int(row["id"])
-            break
-
-    pulat_id = None
-    for nm in PULAT_DISPLAY_NAMES:
-        cursor.execute("SELECT id FROM employees WHERE name = ?", (nm,))
-        row = cursor.fetchone()
-        if row:
-            pulat_id = int(row["id"])
-            break
+    names = TUVALOV_DISPLAY_NAMES + PULAT_DISPLAY_NAMES
+    cursor.execute(f"SELECT id, name FROM employees WHERE name IN ({','.join('?' * len(names))})", names)
+    found = {row["name"]: int(row["id"]) for row in cursor.fetchall()}
+    # ro'yxat tartibi — ustuvorlik
+    farrux_id = next((found[nm] for nm in TUVALOV_DISPLAY_NAMES if nm in found), None)
+    pulat_id = next((found[nm] for nm in PULAT_DISPLAY_NAMES if nm in found), None)
 
     if pulat_id and not farrux_id:
         cursor.execute(
@@ -0,0 +1,225 @@
+"""Qarorlar jurnali — faqat qo'shiladigan complaint_events; event_totals yozuv bilan bir tranzaksiyada, o'tgan vaqt — kunlik nazorat nuqtalaridan."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import date, timedelta
+
+# Shundan eski hodisalar (totals ga qo'shilgan, nazorat nuqtasi qoplagan) o'chiriladi
+EVENTS_KEEP_DAYS = max(1, int(os.getenv("EVENTS_KEEP_DAYS", "180")))
+EVENTS_PRUNE_BATCH = 5000
+
+STATUSES = ("NEW", "DONE", "REJECT")
+
+EVENTS_DDL = (
+    # prev_status — hodisadan oldingi holat (created da NULL); agregat = SUM(status) - SUM(prev_status)
+    """
+    CREATE TABLE IF NOT EXISTS complaint_events (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        complaint_id INTEGER NOT NULL,
+        employee_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,  -- created / decided / reopened / edited
+        prev_status TEXT,
+        status TEXT NOT NULL,
+        actor INTEGER,       -- tg_id
+        at TEXT NOT NULL,
+        note TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_events_complaint ON complaint_events(complaint_id)",
+    "CREATE INDEX IF NOT EXISTS idx_events_at ON complaint_events(at)",
+    """
+    CREATE TABLE IF NOT EXISTS event_totals (
+        employee_id INTEGER PRIMARY KEY,
+        new INTEGER NOT NULL DEFAULT 0,
+        done INTEGER NOT NULL DEFAULT 0,
+        reject INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS event_offsets (
+        name TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+)
+
+# Kunlik nazorat nuqtasi: at < upto bo'lgan hamma hodisalar yig'indisi — as_of shundan boshlaydi
+CHECKPOINT_DDL = """
+    CREATE TABLE IF NOT EXISTS event_checkpoints (
+        upto TEXT NOT NULL,  -- 'YYYY-MM-DD' (kun boshi)
+        employee_id INTEGER NOT NULL,
+        new INTEGER NOT NULL,
+        done INTEGER NOT NULL,
+        reject INTEGER NOT NULL,
+        PRIMARY KEY (upto, employee_id)
+    ) WITHOUT ROWID
+"""
+
+_DELTAS = """
+    SELECT employee_id,
+           SUM(status = 'NEW') - SUM(prev_status IS 'NEW') AS new,
+           SUM(status = 'DONE') - SUM(prev_status IS 'DONE') AS done,
+           SUM(status = 'REJECT') - SUM(prev_status IS 'REJECT') AS reject,
+           MAX(seq) AS last_seq
+    FROM complaint_events
+    WHERE {where}
+    GROUP BY employee_id
+"""
+
+
+def _add_totals(con: sqlite3.Connection, deltas) -> None:
+    con.executemany(
+        """
+        INSERT INTO event_totals(employee_id, new, done, reject) VALUES(?, ?, ?, ?)
+        ON CONFLICT(employee_id) DO UPDATE SET
+            new = new + excluded.new, done = done + excluded.done, reject = reject + excluded.reject
+        """,
+        [(eid, int(new), int(done), int(reject)) for eid, new, done, reject in deltas],
+    )
+
+
+def record(
+    con: sqlite3.Connection,
+    rows: list[tuple[int, int, str | None, str]],
+    kind: str,
+    at: str,
+    actor: int | None = None,
+    note: str | None = None,
+) -> None:
+    """
+    rows: (complaint_id, employee_id, prev_status, status) — chaqiruvchining tranzaksiyasida;
+    event_totals ham shu tranzaksiyada yangilanadi.
+    """
+    con.executemany(
+        """
+        INSERT INTO complaint_events(complaint_id, employee_id, kind, prev_status, status, actor, at, note)
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(cid, eid, kind, prev, status, actor, at, note) for cid, eid, prev, status in rows],
+    )
+    acc: dict[int, list[int]] = {}
+    for _, eid, prev, status in rows:
+        v = acc.setdefault(eid, [0, 0, 0])
+        v[STATUSES.index(status)] += 1
+        if prev is not None:
+            v[STATUSES.index(prev)] -= 1
+    _add_totals(con, [(eid, *v) for eid, v in acc.items() if any(v)])
+
+
+def fold_since(con: sqlite3.Connection, after_seq: int) -> None:
+    """seq > after_seq hodisalar event_totals ga — record() siz yozilganlar (backfill), o'sha tranzaksiyada."""
+    _add_totals(con, [r[:4] for r in con.execute(_DELTAS.format(where="seq > ?"), (after_seq,))])
+
+
+def last_seq(con: sqlite3.Connection) -> int:
+    return int(con.execute("SELECT COALESCE(MAX(seq), 0) FROM complaint_events").fetchone()[0])
+
+
+def totals(con: sqlite3.Connection) -> dict[int, tuple[int, int, int]]:
+    """employee_id -> (NEW, DONE, REJECT) — hozirgi holat (faqat SELECT)."""
+    return {
+        r[0]: (int(r[1]), int(r[2]), int(r[3]))
+        for r in con.execute("SELECT employee_id, new, done, reject FROM event_totals").fetchall()
+    }
+
+
+def _last_checkpoint(con: sqlite3.Connection, at: str | None = None) -> str | None:
+    if at is None:
+        return con.execute("SELECT MAX(upto) FROM event_checkpoints").fetchone()[0]
+    return con.execute("SELECT MAX(upto) FROM event_checkpoints WHERE upto <= ?", (at,)).fetchone()[0]
+
+
+def _snapshot(con: sqlite3.Connection, upto: str | None) -> dict[int, list[int]]:
+    if upto is None:
+        return {}
+    return {
+        r[0]: [int(r[1]), int(r[2]), int(r[3])]
+        for r in con.execute("SELECT employee_id, new, done, reject FROM event_checkpoints WHERE upto = ?", (upto,))
+    }
+
+
+def _add(acc: dict[int, list[int]], eid: int, new: int, done: int, reject: int) -> None:
+    v = acc.setdefault(eid, [0, 0, 0])
+    v[0] += new
+    v[1] += done
+    v[2] += reject
+
+
+def as_of(con: sqlite3.Connection, at: str) -> dict[int, tuple[int, int, int]]:
+    """
+    Berilgan vaqtdagi holat — eng yaqin nazorat nuqtasi + undan at gacha hodisalar.
+    O'chirilgan (EVENTS_KEEP_DAYS dan eski) kunlar ichidagi vaqt — kun boshi aniqligida.
+    """
+    cp = _last_checkpoint(con, at)
+    acc = _snapshot(con, cp)
+    for eid, new, done, reject, _ in con.execute(_DELTAS.format(where="at >= ? AND at <= ?"), (cp or "", at)):
+        _add(acc, eid, int(new), int(done), int(reject))
+    return {eid: tuple(v) for eid, v in acc.items()}
+
+
+def checkpoint(con: sqlite3.Connection, upto: str) -> int:
+    """
+    Oxirgi nuqtadan upto gacha hodisasi bor har kun uchun yig'indi yozadi (kun yopilgach:
+    at < upto hodisalar endi qo'shilmaydi). Qaytaradi: yozilgan nuqtalar soni.
+    """
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        last = _last_checkpoint(con)
+        acc = _snapshot(con, last)
+        rows = con.execute(
+            """
+            SELECT substr(at, 1, 10) AS day, employee_id,
+                   SUM(status = 'NEW') - SUM(prev_status IS 'NEW'),
+                   SUM(status = 'DONE') - SUM(prev_status IS 'DONE'),
+                   SUM(status = 'REJECT') - SUM(prev_status IS 'REJECT')
+            FROM complaint_events
+            WHERE at >= ? AND at < ?
+            GROUP BY day, employee_id
+            ORDER BY day
+            """,
+            (last or "", upto),
+        ).fetchall()
+        days = 0
+        for i, (day, eid, new, done, reject) in enumerate(rows):
+            _add(acc, eid, int(new), int(done), int(reject))
+            if i + 1 < len(rows) and rows[i + 1][0] == day:
+                continue
+            cp = (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+            con.executemany(
+                "INSERT OR REPLACE INTO event_checkpoints(upto, employee_id, new, done, reject) VALUES(?, ?, ?, ?, ?)",
+                [(cp, e, *v) for e, v in acc.items()],
+            )
+            days += 1
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    return days
+
+
+def prune(con: sqlite3.Connection, before: str, batch: int = EVENTS_PRUNE_BATCH) -> int:
+    """
+    before dan eski va nazorat nuqtasi qoplagan hodisalarning bir partiyasini o'chiradi
+    (totals yozilish paytida yangilangan). Qaytaradi: o'chirilganlar soni (batch dan kam — tugadi).
+    """
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        cp = _last_checkpoint(con, before)
+        if cp is None:
+            con.commit()
+            return 0
+        n = con.execute(
+            """
+            DELETE FROM complaint_events WHERE seq IN (
+                SELECT seq FROM complaint_events WHERE at < ? LIMIT ?
+            )
+            """,
+            (cp, batch),
+        ).rowcount
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    return n
@@ -0,0 +1,241 @@
+"""Shikoyatlarni CSV/XLSX ga eksport — SQLite dan bo'laklab, xotira chunk hajmi bilan chegaralangan."""
+
+from __future__ import annotations
+
+import csv
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterator
+
+import archive
+
+EXPORT_CHUNK = max(50, int(os.getenv("EXPORT_CHUNK", "500")))
+# Telegram bot API yuklash chegarasi 50 MB — zaxira bilan
+EXPORT_PART_BYTES = max(1024 * 1024, int(os.getenv("EXPORT_PART_BYTES", str(45 * 1024 * 1024))))
+EXPORT_XLSX_ROWS_PER_PART = max(1000, int(os.getenv("EXPORT_XLSX_ROWS_PER_PART", "200000")))
+
+STATUSES = ("NEW", "DONE", "REJECT")
+FORMATS = ("csv", "xlsx")
+
+COLUMNS = (
+    "id",
+    "employee",
+    "from_user_id",
+    "from_user_name",
+    "text",
+    "created_at",
+    "status",
+    "decided_by",
+    "decided_at",
+    "decision_note",
+)
+
+
+@dataclass(frozen=True)
+class ExportFilter:
+    date_from: str | None = None  # YYYY-MM-DD, shu kun ham kiradi
+    date_to: str | None = None    # YYYY-MM-DD, shu kun ham kiradi
+    employee: str | None = None
+    status: str | None = None
+
+
+def _parse_day(token: str) -> str | None:
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(token, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_export_args(raw: str, employees: list[str]) -> tuple[ExportFilter, str]:
+    """
+    `/export [from] [to] [employee] [status] [csv|xlsx]` argumentlari.
+    Xodim — ro'yxatdagi tartib raqami (1..N) yoki ism (qismi ham bo'ladi).
+    """
+    tokens = (raw or "").split()
+    fmt = "csv"
+    status = None
+    days: list[str] = []
+    rest: list[str] = []
+    for tok in tokens:
+        low = tok.lower()
+        if low in FORMATS:
+            fmt = low
+        elif tok.upper() in STATUSES:
+            status = tok.upper()
+        elif low in ("all", "*", "-"):
+            continue
+        elif len(days) < 2 and not rest and _parse_day(tok):
+            days.append(_parse_day(tok))
+        else:
+            rest.append(tok)
+
+    employee = None
+    if rest:
+        needle = " ".join(rest)
+        if needle.isdigit() and 1 <= int(needle) <= len(employees):
+            employee = employees[int(needle) - 1]
+        else:
+            key = needle.casefold()
+            matches = [e for e in employees if e.casefold() == key] or [
+                e for e in employees if key in e.casefold()
+            ]
+            if len(matches) != 1:
+                raise ValueError(f"Ходим аниқланмади: {needle}")
+            employee = matches[0]
+
+    date_from = days[0] if days else None
+    date_to = days[1] if len(days) > 1 else None
+    if date_from and date_to and date_from > date_to:
+        date_from, date_to = date_to, date_from
+    return ExportFilter(date_from, date_to, employee, status), fmt
+
+
+def build_query(f: ExportFilter) -> tuple[str, list]:
+    where: list[str] = []
+    params: list = []
+    if f.date_from:
+        where.append("created_at >= ?")
+        params.append(f.date_from)
+    if f.date_to:
+        where.append("created_at < ?")
+        params.append((date.fromisoformat(f.date_to) + timedelta(days=1)).isoformat())
+    if f.employee:
+        # integer indeks bo'yicha; nom bir marta lug'atdan olinadi
+        where.append("employee_id = (SELECT id FROM employees WHERE name = ?)")
+        params.append(f.employee)
+    if f.status:
+        where.append("status = ?")
+        params.append(f.status)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM {archive.ALL_VIEW}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY id", params
+
+
+def iter_rows(db_path: str, archive_path: str, f: ExportFilter, chunk: int = EXPORT_CHUNK) -> Iterator[tuple]:
+    """Natijani fetchmany bilan oqimlaydi — xotirada bir vaqtda `chunk` tadan ko'p qator bo'lmaydi."""
+    sql, params = build_query(f)
+    con = sqlite3.connect(db_path)
+    try:
+        archive.attach_archive(con, archive_path)
+        cur = con.execute(sql, params)
+        while True:
+            batch = cur.fetchmany(chunk)
+            if not batch:
+                break
+            yield from batch
+    finally:
+        con.close()
+
+
+def _part_path(out_dir: str, base_name: str, part: int, ext: str) -> str:
+    return os.path.join(out_dir, f"{base_name}_part{part}.{ext}")
+
+
+def write_csv_parts(
+    rows: Iterator[tuple],
+    out_dir: str,
+    base_name: str,
+    part_bytes: int = EXPORT_PART_BYTES,
+) -> list[tuple[str, int]]:
+    """CSV qismlari: (yo'l, qatorlar soni). Har qism sarlavha bilan, hajmi ~part_bytes gacha."""
+    parts: list[tuple[str, int]] = []
+    fh = None
+    writer = None
+    count = 0
+    try:
+        for row in rows:
+            # tell() buferni to'kadi — har qatorda emas, har 100 qatorda tekshiramiz
+            if fh is None or (count % 100 == 0 and fh.tell() >= part_bytes):
+                if fh is not None:
+                    fh.close()
+                    parts[-1] = (parts[-1][0], count)
+                path = _part_path(out_dir, base_name, len(parts) + 1, "csv")
+                fh = open(path, "w", newline="", encoding="utf-8-sig")
+                writer = csv.writer(fh)
+                writer.writerow(COLUMNS)
+                parts.append((path, 0))
+                count = 0
+            writer.writerow(row)
+            count += 1
+        if fh is None:
+            path = _part_path(out_dir, base_name, 1, "csv")
+            with open(path, "w", newline="", encoding="utf-8-sig") as empty:
+                csv.writer(empty).writerow(COLUMNS)
+            return [(path, 0)]
+        parts[-1] = (parts[-1][0], count)
+        return parts
+    finally:
+        if fh is not None and not fh.closed:
+            fh.close()
+
+
+# Siqilmagan XML ning yuqori bahosi: katak/qator teglari (r="AB1234567", t="s", shared string)
+_XLSX_CELL_OVERHEAD = 64
+_XLSX_ROW_OVERHEAD = 32
+
+
+def _xlsx_row_bytes(row) -> int:
+    return _XLSX_ROW_OVERHEAD + sum(
+        _XLSX_CELL_OVERHEAD + (len(str(v).encode("utf-8")) if v is not None else 0) for v in row
+    )
+
+
+def write_xlsx_parts(
+    db_path: str,
+    archive_path: str,
+    f: ExportFilter,
+    out_dir: str,
+    base_name: str,
+    part_bytes: int = EXPORT_PART_BYTES,
+    rows_per_part: int = EXPORT_XLSX_ROWS_PER_PART,
+) -> list[tuple[str, int]]:
+    """
+    Alohida jarayonda ishlaydi (openpyxl write_only) — asosiy event loop bloklanmaydi.
+    Hajm save() gacha noma'lum (zip) — siqilmagan XML bahosi part_bytes ga yetganda yangi qism;
+    siqilgan fayl undan katta bo'lmaydi.
+    """
+    from openpyxl import Workbook
+
+    parts: list[tuple[str, int]] = []
+    wb = ws = None
+    count = 0
+    size = 0
+
+    def _flush():
+        path = _part_path(out_dir, base_name, len(parts) + 1, "xlsx")
+        wb.save(path)
+        parts.append((path, count))
+
+    for row in iter_rows(db_path, archive_path, f):
+        row_bytes = _xlsx_row_bytes(row)
+        if wb is None or count >= rows_per_part or (count and size + row_bytes > part_bytes):
+            if wb is not None:
+                _flush()
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("complaints")
+            ws.append(list(COLUMNS))
+            count = 0
+            size = _xlsx_row_bytes(COLUMNS)
+        ws.append(list(row))
+        count += 1
+        size += row_bytes
+    if wb is None:
+        wb = Workbook(write_only=True)
+        wb.create_sheet("complaints").append(list(COLUMNS))
+    _flush()
+    return parts
+
+
+def export_base_name(f: ExportFilter) -> str:
+    bits = ["complaints", f.date_from or "all", f.date_to or "now"]
+    if f.employee:
+        bits.append(re.sub(r"\W+", "_", f.employee).strip("_"))
+    if f.status:
+        bits.append(f.status.lower())
+    return "_".join(bits)
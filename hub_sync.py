@@ -0,0 +1,261 @@
+"""Hub ni o'tgan kunlar bo'yicha tuzatish — (xodim, kun) xulosalari bitta GROUP BY da, faqat o'zgarganlari yuboriladi."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable
+
+import metrics
+from lifecycle import spawn
+
+log = logging.getLogger(__name__)
+
+# Tungi reconcile — oxirgi shuncha kun (bugun ham)
+HUB_RECONCILE_DAYS = max(1, int(os.getenv("HUB_RECONCILE_DAYS", "7")))
+HUB_RECONCILE_AT = os.getenv("HUB_RECONCILE_AT", "02:30").strip()
+# Hub/Telegram ingest ni bosib qo'ymaslik uchun
+HUB_PUSH_PER_SEC = max(0.1, float(os.getenv("HUB_PUSH_PER_SEC", "2")))
+
+HUB_DDL = (
+    # hub ga oxirgi muvaffaqiyatli yuborilgan xulosa
+    """
+    CREATE TABLE IF NOT EXISTS hub_pushed (
+        employee_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        pushed_at TEXT NOT NULL,
+        PRIMARY KEY (employee_id, day)
+    ) WITHOUT ROWID
+    """,
+    # tugamagan diapazon — keyingi boot da davom etadi
+    """
+    CREATE TABLE IF NOT EXISTS hub_backfill_job (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        date_from TEXT NOT NULL,
+        date_to TEXT NOT NULL,
+        started_at TEXT NOT NULL
+    )
+    """,
+)
+
+
+def summary_text(ochiq: int, done: int, rad: int) -> str:
+    return f"Ishxona: ochiq={ochiq}, yopilgan={done}, rad={rad}"
+
+
+def day_summaries(con: sqlite3.Connection, date_from: date, date_to: date) -> dict[tuple[int, str], tuple[str, str]]:
+    """
+    (employee_id, day) -> (xodim nomi, xulosa) — diapazondagi hamma kun bitta so'rovda.
+    Oldin yuborilgan, endi shikoyati yo'q kunlar (reset) — nol xulosa bilan.
+    """
+    start, end = date_from.isoformat(), (date_to + timedelta(days=1)).isoformat()
+    out: dict[tuple[int, str], tuple[str, str]] = {}
+    for r in con.execute(
+        """
+        SELECT employee_id, MAX(employee) AS employee, substr(created_at, 1, 10) AS day,
+               SUM(status = 'NEW') AS new, SUM(status = 'DONE') AS done, SUM(status = 'REJECT') AS rej
+        FROM complaints_all
+        WHERE created_at >= ? AND created_at < ?
+        GROUP BY employee_id, day
+        """,
+        (start, end),
+    ):
+        out[(r[0], r[2])] = (r[1], summary_text(int(r[3]), int(r[4]), int(r[5])))
+    for r in con.execute(
+        """
+        SELECT p.employee_id, e.name, p.day FROM hub_pushed p JOIN employees e ON e.id = p.employee_id
+        WHERE p.day >= ? AND p.day < ?
+        """,
+        (start, end),
+    ):
+        out.setdefault((r[0], r[2]), (r[1], summary_text(0, 0, 0)))
+    return out
+
+
+def pushed(con: sqlite3.Connection, date_from: date, date_to: date) -> dict[tuple[int, str], str]:
+    rows = con.execute(
+        "SELECT employee_id, day, summary FROM hub_pushed WHERE day >= ? AND day <= ?",
+        (date_from.isoformat(), date_to.isoformat()),
+    ).fetchall()
+    return {(r[0], r[1]): r[2] for r in rows}
+
+
+def record_pushed(con: sqlite3.Connection, employee_id: int, day: str, summary: str) -> None:
+    con.execute(
+        """
+        INSERT INTO hub_pushed(employee_id, day, summary, pushed_at) VALUES(?, ?, ?, datetime('now'))
+        ON CONFLICT(employee_id, day) DO UPDATE SET summary = excluded.summary, pushed_at = excluded.pushed_at
+        """,
+        (employee_id, day, summary),
+    )
+
+
+@dataclass(frozen=True)
+class Result:
+    changed: int
+    sent: int
+    failed: int
+    skipped: int  # tg_id yo'q
+
+
+class Reconciler:
+    """
+    Bitta diapazon ishi bir vaqtda. connect() — complaints_all ko'rinadigan ulanish;
+    push(tg_id, summary, day) -> ok. Har muvaffaqiyatli yuborish darhol hub_pushed ga yoziladi.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], sqlite3.Connection],
+        tg_id: Callable[[str], int | None],
+        push: Callable[[int, str, str], Awaitable[bool]],
+    ):
+        self.connect = connect
+        self.tg_id = tg_id
+        self.push = push
+        self.task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def _save_job(self, date_from: date, date_to: date) -> None:
+        con = self.connect()
+        con.execute(
+            "INSERT OR REPLACE INTO hub_backfill_job(id, date_from, date_to, started_at) "
+            "VALUES(1, ?, ?, datetime('now'))",
+            (date_from.isoformat(), date_to.isoformat()),
+        )
+        con.commit()
+        con.close()
+
+    def _finish_job(self) -> None:
+        con = self.connect()
+        con.execute("DELETE FROM hub_backfill_job")
+        con.commit()
+        con.close()
+
+    def _pending_job(self) -> tuple[date, date] | None:
+        con = self.connect()
+        row = con.execute("SELECT date_from, date_to FROM hub_backfill_job WHERE id = 1").fetchone()
+        con.close()
+        return (date.fromisoformat(row[0]), date.fromisoformat(row[1])) if row else None
+
+    def _diff(self, date_from: date, date_to: date) -> list[tuple[int, str, str, str]]:
+        con = self.connect()
+        try:
+            current = day_summaries(con, date_from, date_to)
+            last = pushed(con, date_from, date_to)
+        finally:
+            con.close()
+        return sorted(
+            (eid, day, name, summary)
+            for (eid, day), (name, summary) in current.items()
+            if last.get((eid, day)) != summary
+        )
+
+    def _record(self, employee_id: int, day: str, summary: str) -> None:
+        con = self.connect()
+        record_pushed(con, employee_id, day, summary)
+        con.commit()
+        con.close()
+
+    async def run(self, date_from: date, date_to: date, notify: Callable[[str], Awaitable[None]] | None = None) -> Result:
+        """Xato bo'lgan kunlar bo'lsa — ish qatori shu kunlar oralig'iga toraytiriladi (keyingi boot da qayta)."""
+        changes = await asyncio.to_thread(self._diff, date_from, date_to)
+        sent = skipped = 0
+        failed_days: set[str] = set()
+        for eid, day, name, summary in changes:
+            tid = self.tg_id(name)
+            if not tid:
+                skipped += 1
+                continue
+            if await self.push(tid, summary, day):
+                await asyncio.to_thread(self._record, eid, day, summary)
+                sent += 1
+            else:
+                failed_days.add(day)  # yozilmaydi — keyingi reconcile qayta yuboradi
+            await asyncio.sleep(1 / HUB_PUSH_PER_SEC)
+        failed = len(changes) - sent - skipped
+        if failed_days:
+            await asyncio.to_thread(
+                self._save_job, date.fromisoformat(min(failed_days)), date.fromisoformat(max(failed_days))
+            )
+        else:
+            await asyncio.to_thread(self._finish_job)
+        metrics.inc("hub_reconcile_sent", sent)
+        metrics.inc("hub_reconcile_failed", failed)
+        res = Result(len(changes), sent, failed, skipped)
+        log.info("Hub reconcile %s..%s: %s", date_from, date_to, res)
+        if notify:
+            await notify(
+                f"🔁 Hub: {date_from}..{date_to} — ўзгарган <b>{res.changed}</b>, юборилди <b>{sent}</b>, "
+                f"хато <b>{failed}</b>, tg_id йўқ <b>{skipped}</b>"
+            )
+        return res
+
+    def start(
+        self, date_from: date, date_to: date, notify: Callable[[str], Awaitable[None]] | None = None
+    ) -> bool:
+        """Fonda ishga tushiradi; boshqa ish ketayotgan bo'lsa False."""
+        if self.running:
+            return False
+        # oldingi ishning xato kunlari yangi diapazon tashqarisida qolib ketmasin
+        job = self._pending_job()
+        if job:
+            date_from, date_to = min(date_from, job[0]), max(date_to, job[1])
+        self._save_job(date_from, date_to)
+        self.task = spawn(self._guarded(date_from, date_to, notify), name=f"hub_reconcile:{date_from}:{date_to}")
+        return True
+
+    async def _guarded(
+        self, date_from: date, date_to: date, notify: Callable[[str], Awaitable[None]] | None
+    ) -> None:
+        # ish qatori qoladi — keyingi boot da resume
+        try:
+            await self.run(date_from, date_to, notify)
+        except Exception as e:
+            log.exception("Hub reconcile %s..%s xato", date_from, date_to)
+            metrics.inc("hub_reconcile_errors")
+            if notify:
+                try:
+                    await notify(
+                        f"⚠️ Hub: {date_from}..{date_to} — хато ({type(e).__name__}), кейинги boot да давом этади."
+                    )
+                except Exception:
+                    log.exception("Hub reconcile: notify xato")
+
+    def resume(self) -> bool:
+        """Boot: uzilgan diapazon bo'lsa — qaytadan (yuborilganlari hub_pushed bo'yicha o'tkaziladi)."""
+        job = self._pending_job()
+        return bool(job) and self.start(*job)
+
+    def stop(self) -> None:
+        # hub_backfill_job qoladi — keyingi boot da resume
+        if self.running:
+            self.task.cancel()
+
+
+def parse_range(raw: str, today: date) -> tuple[date, date]:
+    """`<from> <to>` (YYYY-MM-DD yoki DD.MM.YYYY); to bo'lmasa — bugun. Xato — ValueError."""
+    days = []
+    for tok in (raw or "").split():
+        for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+            try:
+                days.append(datetime.strptime(tok, fmt).date())
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"sana noto'g'ri: {tok}")
+    if not days or len(days) > 2:
+        raise ValueError("format: /hub_backfill YYYY-MM-DD [YYYY-MM-DD]")
+    date_from, date_to = days[0], days[-1] if len(days) == 2 else today
+    if date_from > date_to or date_to > today:
+        raise ValueError("from <= to <= bugun bo'lishi kerak")
+    return date_from, date_to
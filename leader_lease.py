@@ -0,0 +1,149 @@
+"""Bitta faol nusxa — umumiy volume dagi SQLite lease (heartbeat + TTL)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Awaitable, Callable
+
+log = logging.getLogger(__name__)
+
+LEASE_TTL = max(5.0, float(os.getenv("LEADER_LEASE_TTL", "15")))
+# Standby shu oraliqda tekshiradi — lease tugagach bir necha soniyada egallaydi
+LEASE_POLL = max(0.5, float(os.getenv("LEADER_LEASE_POLL", "2")))
+
+
+def lease_db_path(db_path: str) -> str:
+    """Lease alohida faylda — asosiy DB dagi uzun qulf (VACUUM, migratsiya) uzaytirishni to'xtatmasin."""
+    return os.getenv("LEADER_LEASE_PATH", "").strip() or f"{db_path}.lease"
+
+
+_DDL = """
+    CREATE TABLE IF NOT EXISTS leader_lease (
+        name TEXT PRIMARY KEY,
+        holder TEXT NOT NULL,
+        acquired_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    )
+"""
+
+
+class LeaderLease:
+    def __init__(self, db_path: str, name: str = "bot", ttl: float = LEASE_TTL, legacy_path: str | None = None):
+        self.db_path = db_path
+        # eski versiya lease ni asosiy DB da ushlaydi — deploy ustma-ust tushganda uni ham hurmat qilamiz
+        self.legacy_path = legacy_path
+        self.name = name
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.expires_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        con.execute(_DDL)
+        return con
+
+    def _legacy_alive(self) -> bool:
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return False
+        con = sqlite3.connect(f"file:{self.legacy_path}?mode=ro", uri=True, timeout=5)
+        try:
+            row = con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leader_lease'"
+            ).fetchone()
+            return bool(row) and con.execute(
+                "SELECT 1 FROM leader_lease WHERE name = ? AND holder != ? AND expires_at > ?",
+                (self.name, self.holder, time.time()),
+            ).fetchone() is not None
+        finally:
+            con.close()
+
+    def try_acquire(self) -> bool:
+        """Egallaydi yoki uzaytiradi. Boshqa tirik egasi bo'lsa False."""
+        if not self.expires_at and self._legacy_alive():
+            return False
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute(
+                "SELECT holder, expires_at FROM leader_lease WHERE name = ?", (self.name,)
+            ).fetchone()
+            now = time.time()
+            if row and row[0] != self.holder and row[1] > now:
+                con.execute("ROLLBACK")
+                return False
+            expires = now + self.ttl
+            if row and row[0] == self.holder:
+                con.execute(
+                    "UPDATE leader_lease SET expires_at = ? WHERE name = ?", (expires, self.name)
+                )
+            else:
+                con.execute(
+                    "INSERT OR REPLACE INTO leader_lease(name, holder, acquired_at, expires_at) VALUES(?,?,?,?)",
+                    (self.name, self.holder, now, expires),
+                )
+            con.execute("COMMIT")
+            self.expires_at = expires
+            return True
+        finally:
+            con.close()
+
+    def current_holder(self) -> tuple[str, float] | None:
+        con = self._connect()
+        try:
+            row = con.execute(
+                "SELECT holder, expires_at FROM leader_lease WHERE name = ?", (self.name,)
+            ).fetchone()
+            return (row[0], row[1]) if row else None
+        finally:
+            con.close()
+
+    def release(self) -> None:
+        try:
+            con = self._connect()
+            try:
+                con.execute(
+                    "DELETE FROM leader_lease WHERE name = ? AND holder = ?", (self.name, self.holder)
+                )
+            finally:
+                con.close()
+        except sqlite3.Error as exc:
+            log.warning("Lease release xato: %s", exc)
+        self.expires_at = 0.0
+
+    async def acquire(self) -> None:
+        """Leader bo'lguncha kutadi (standby rejimi)."""
+        announced = False
+        while True:
+            try:
+                if await asyncio.to_thread(self.try_acquire):
+                    log.info("Leader lease olindi: %s (ttl %.0fs)", self.holder, self.ttl)
+                    return
+            except sqlite3.Error as exc:
+                log.warning("Lease acquire xato: %s", exc)
+            if not announced:
+                cur = await asyncio.to_thread(self.current_holder)
+                log.warning("Standby: leader %s — kutyapman", cur[0] if cur else "?")
+                announced = True
+            await asyncio.sleep(LEASE_POLL)
+
+    async def keep_alive(self, on_lost: Callable[[], Awaitable[None]]) -> None:
+        """TTL/3 da uzaytiradi. Muddat o'tguncha uzaytira olmasa — on_lost."""
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                if await asyncio.to_thread(self.try_acquire):
+                    continue
+                log.error("Leader lease boshqa nusxaga o'tdi")
+            except sqlite3.Error as exc:
+                if time.time() < self.expires_at - 1:
+                    log.warning("Lease renew xato (qayta uriniladi): %s", exc)
+                    continue
+                log.error("Leader lease muddati o'tdi: %s", exc)
+            await on_lost()
+            return
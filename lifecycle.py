@@ -0,0 +1,139 @@
+"""SIGTERM da tartibli to'xtash — fon ishlar muddat ichida tugatiladi yoki keyinga saqlanadi."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import time
+from typing import Any, Awaitable, Callable, Coroutine
+
+log = logging.getLogger(__name__)
+
+# Railway SIGTERM dan keyin ~30s da SIGKILL yuboradi — zaxira bilan
+SHUTDOWN_DEADLINE = max(1.0, float(os.getenv("SHUTDOWN_DEADLINE", "20")))
+
+# task -> tugatib ulgurmasa chaqiriladigan persist (sinxron, qisqa)
+_TASKS: dict[asyncio.Task, Callable[[], None] | None] = {}
+
+
+def spawn(
+    coro: Coroutine[Any, Any, Any],
+    *,
+    name: str | None = None,
+    persist: Callable[[], None] | None = None,
+) -> asyncio.Task:
+    task = asyncio.get_running_loop().create_task(coro, name=name)
+    _TASKS[task] = persist
+    task.add_done_callback(_forget)
+    return task
+
+
+def _forget(task: asyncio.Task) -> None:
+    _TASKS.pop(task, None)
+    if not task.cancelled() and task.exception() is not None:
+        log.error("Fon vazifa %s xato: %r", task.get_name(), task.exception())
+
+
+def pending_count() -> int:
+    return len(_TASKS)
+
+
+async def drain(timeout: float) -> tuple[int, int, int]:
+    """
+    Fon vazifalarni timeout gacha kutadi (kutish paytida qo'shilganlarini ham).
+    Qolganlari persist qilinib bekor qilinadi. Qaytaradi: (tugadi, saqlandi, yo'qoldi).
+    """
+    deadline = time.monotonic() + timeout
+    finished = 0
+    while _TASKS:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            break
+        batch = list(_TASKS)
+        done, _ = await asyncio.wait(batch, timeout=left)
+        finished += len(done)
+
+    persisted = dropped = 0
+    rest = list(_TASKS.items())
+    for task, persist in rest:
+        if persist is not None:
+            try:
+                persist()
+                persisted += 1
+            except Exception:
+                log.exception("Persist xato: %s", task.get_name())
+                dropped += 1
+        else:
+            dropped += 1
+        task.cancel()
+    if rest:
+        await asyncio.gather(*(t for t, _ in rest), return_exceptions=True)
+    return finished, persisted, dropped
+
+
+class InflightMiddleware:
+    """dp.update outer middleware — ishlov berilayotgan update lar soni."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(
+        self,
+        handler: Callable[[Any, dict[str, Any]], Awaitable[Any]],
+        event: Any,
+        data: dict[str, Any],
+    ) -> Any:
+        self.count += 1
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self.count -= 1
+            if not self.count:
+                self._idle.set()
+
+    async def wait_idle(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=max(0.0, timeout))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class Shutdown:
+    def __init__(self) -> None:
+        self.event = asyncio.Event()
+        self.reason = ""
+        self.exit_code = 0
+        self._after_exit: list[Callable[[], Any]] = []
+
+    def install_signals(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request, sig.name)
+            except NotImplementedError:  # Windows
+                pass
+
+    def request(self, reason: str, exit_code: int = 0) -> None:
+        if self.event.is_set():
+            return
+        log.warning("Shutdown so'raldi: %s", reason)
+        self.reason = reason
+        self.exit_code = exit_code
+        self.event.set()
+
+    def after_exit(self, fn: Callable[[], Any]) -> None:
+        """Hamma narsa yopilgandan keyin (lease ham) — masalan, DB fayllarini o'chirish."""
+        self._after_exit.append(fn)
+
+    def run_after_exit(self) -> None:
+        for fn in self._after_exit:
+            try:
+                fn()
+            except Exception:
+                log.exception("after_exit xato")
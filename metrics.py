@@ -0,0 +1,62 @@
+"""Jarayon ichidagi oddiy metrikalar — hisoblagich, gauge, vaqt o'lchovlari (/metrics)."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+
+_COUNTERS: dict[str, int] = defaultdict(int)
+_GAUGES: dict[str, float] = {}
+# name -> [count, sum, max]
+_TIMINGS: dict[str, list[float]] = {}
+
+
+def inc(name: str, n: int = 1) -> None:
+    _COUNTERS[name] += n
+
+
+def set_gauge(name: str, value: float) -> None:
+    _GAUGES[name] = value
+
+
+def observe(name: str, value: float) -> None:
+    t = _TIMINGS.get(name)
+    if t is None:
+        _TIMINGS[name] = [1, value, value]
+    else:
+        t[0] += 1
+        t[1] += value
+        if value > t[2]:
+            t[2] = value
+
+
+def counter(name: str) -> int:
+    return _COUNTERS.get(name, 0)
+
+
+def snapshot() -> dict:
+    return {
+        "counters": dict(_COUNTERS),
+        "gauges": dict(_GAUGES),
+        "timings": {
+            k: {"count": int(c), "avg": (s / c if c else 0.0), "max": m}
+            for k, (c, s, m) in _TIMINGS.items()
+        },
+    }
+
+
+def render() -> str:
+    snap = snapshot()
+    lines = []
+    for k in sorted(snap["counters"]):
+        lines.append(f"{k} = {snap['counters'][k]}")
+    for k in sorted(snap["counters"]):
+        if k.endswith("_hit"):
+            base = k[:-4]
+            hit, miss = snap["counters"][k], snap["counters"].get(base + "_miss", 0)
+            lines.append(f"{base}_hit_rate = {hit / (hit + miss):.0%}")
+    for k in sorted(snap["gauges"]):
+        lines.append(f"{k} = {snap['gauges'][k]:g}")
+    for k in sorted(snap["timings"]):
+        t = snap["timings"][k]
+        lines.append(f"{k}: n={t['count']} avg={t['avg']:.1f} max={t['max']:.1f}")
+    return "\n".join(lines) or "—"
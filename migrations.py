@@ -0,0 +1,302 @@
+"""Sxema migratsiyalari — tartiblangan ro'yxat, holat PRAGMA user_version da; katta backfill lar fonda, partiyalab."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable
+
+import archive
+import events
+import hub_sync
+import reports
+import schema
+import sla
+import versions
+
+log = logging.getLogger(__name__)
+
+MIGRATION_BATCH = max(100, int(os.getenv("MIGRATION_BATCH", "2000")))
+# partiyalar orasida — polling va handler larning yozuvlari navbat kutmasin
+MIGRATION_PAUSE = 0.05
+
+# Fon backfill holati: qaysi id gacha yetdi, tugadimi
+_PROGRESS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_backfill (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        last_id INTEGER NOT NULL DEFAULT 0,
+        rows INTEGER NOT NULL DEFAULT 0,
+        done INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    ddl — tez, idempotent (uzilsa qayta ishlaydi), user_version bilan birga commit qilinadi.
+    backfill(con, after_id, batch) -> (last_id, ko'rilgan qatorlar); 0 — tugadi.
+    """
+
+    version: int
+    name: str
+    ddl: Callable[[sqlite3.Connection], None]
+    backfill: Callable[[sqlite3.Connection, int, int], tuple[int, int]] | None = None
+
+
+def _progress_table(con: sqlite3.Connection) -> None:
+    con.execute(_PROGRESS_DDL)
+
+
+def _core(con: sqlite3.Connection) -> None:
+    # eski matnli jadval faqat qayta nomlanadi — ko'chirish fonda (_backfill_core)
+    schema.ensure_schema(con)
+
+
+def _backfill_core(con: sqlite3.Connection, after: int, batch: int) -> tuple[int, int]:
+    return schema.normalize_chunk(con, after, batch)
+
+
+def _rollups(con: sqlite3.Connection) -> None:
+    if "employee" in schema.columns(con, "daily_rollups"):
+        con.execute("DROP TABLE daily_rollups")  # hosila ma'lumot — qayta hisoblanadi
+    con.execute(reports.ROLLUPS_DDL)
+
+
+def _hub_pending(con: sqlite3.Connection) -> None:
+    # shutdown da ulgurmagan hub sinxronlari — keyingi boot da yuboriladi
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS hub_pending (
+            employee TEXT NOT NULL,
+            day TEXT NOT NULL,
+            PRIMARY KEY (employee, day)
+        ) WITHOUT ROWID
+    """)
+
+
+def _sla(con: sqlite3.Connection) -> None:
+    con.execute(sla.SLA_DDL)
+
+
+def _media(con: sqlite3.Connection) -> None:
+    for ddl in schema.MEDIA_DDL:
+        con.execute(ddl)
+
+
+def _decision_secs(con: sqlite3.Connection) -> None:
+    for s in ("main", archive.ARCHIVE_SCHEMA):
+        if "decision_secs" not in schema.columns(con, "complaints", s):
+            con.execute(f"ALTER TABLE {s}.complaints ADD COLUMN decision_secs INTEGER")
+
+
+def _backfill_decision_secs(con: sqlite3.Connection, after: int, batch: int) -> tuple[int, int]:
+    row = con.execute(
+        """
+        SELECT MAX(id), COUNT(*) FROM (
+            SELECT id FROM main.complaints WHERE id > :after
+            UNION ALL
+            SELECT id FROM arch.complaints WHERE id > :after
+            ORDER BY id LIMIT :batch
+        )
+        """,
+        {"after": after, "batch": batch},
+    ).fetchone()
+    if row[0] is None:
+        return after, 0
+    last = int(row[0])
+    for s in ("main", archive.ARCHIVE_SCHEMA):
+        con.execute(
+            f"""
+            UPDATE {s}.complaints SET decision_secs = {schema.DECISION_SECS_SQL.format(decided='decided_at')}
+            WHERE id > ? AND id <= ? AND decided_at IS NOT NULL AND decision_secs IS NULL
+            """,
+            (after, last),
+        )
+    return last, int(row[1])
+
+
+def _events(con: sqlite3.Connection) -> None:
+    for ddl in events.EVENTS_DDL:
+        con.execute(ddl)
+
+
+def _backfill_events(con: sqlite3.Connection, after: int, batch: int) -> tuple[int, int]:
+    """Jurnaldan oldingi shikoyatlar uchun created/decided hodisalari; jonli yozilganlari takrorlanmaydi."""
+    row = con.execute(
+        """
+        SELECT MAX(id), COUNT(*) FROM (
+            SELECT id FROM main.complaints WHERE id > :after
+            UNION ALL
+            SELECT id FROM arch.complaints WHERE id > :after
+            ORDER BY id LIMIT :batch
+        )
+        """,
+        {"after": after, "batch": batch},
+    ).fetchone()
+    if row[0] is None:
+        return after, 0
+    last = int(row[0])
+    before = events.last_seq(con)
+    for s in ("main", archive.ARCHIVE_SCHEMA):
+        con.execute(
+            f"""
+            INSERT INTO complaint_events(complaint_id, employee_id, kind, prev_status, status, actor, at)
+            SELECT c.id, c.employee_id, 'created', NULL, 'NEW', r.tg_id, c.created_at
+            FROM {s}.complaints c JOIN main.reporters r ON r.id = c.reporter_id
+            WHERE c.id > ? AND c.id <= ?
+              AND NOT EXISTS (SELECT 1 FROM complaint_events e WHERE e.complaint_id = c.id AND e.kind = 'created')
+            ORDER BY c.id
+            """,
+            (after, last),
+        )
+        con.execute(
+            f"""
+            INSERT INTO complaint_events(complaint_id, employee_id, kind, prev_status, status, actor, at, note)
+            SELECT c.id, c.employee_id, 'decided', 'NEW', c.status, c.decided_by,
+                   COALESCE(c.decided_at, c.created_at), c.decision_note
+            FROM {s}.complaints c
+            WHERE c.id > ? AND c.id <= ? AND c.status != 'NEW'
+              AND NOT EXISTS (
+                  SELECT 1 FROM complaint_events e
+                  WHERE e.complaint_id = c.id AND e.kind IN ('decided', 'reopened')
+              )
+            ORDER BY c.id
+            """,
+            (after, last),
+        )
+    # totals shu partiya tranzaksiyasida — o'qishlar faqat SELECT
+    events.fold_since(con, before)
+    return last, int(row[1])
+
+
+def _hub_pushed(con: sqlite3.Connection) -> None:
+    # bo'sh boshlanadi — birinchi reconcile oxirgi kunlarni bir marta qayta yuboradi
+    for ddl in hub_sync.HUB_DDL:
+        con.execute(ddl)
+
+
+def _event_checkpoints(con: sqlite3.Connection) -> None:
+    # bo'sh boshlanadi — birinchi tungi compact butun tarixni bir o'tishda nuqtalarga yig'adi
+    con.execute(events.CHECKPOINT_DDL)
+
+
+def _inline_totals(con: sqlite3.Connection) -> None:
+    # oldin totals o'qishda offset dan keyin yig'ilardi — qolgan dumni bir marta qo'shib, offset ni olib tashlaymiz
+    row = con.execute("SELECT seq FROM event_offsets WHERE name = 'totals'").fetchone()
+    events.fold_since(con, int(row[0]) if row else 0)
+    con.execute("DROP TABLE event_offsets")
+
+
+# Faqat oxiriga qo'shiladi; mavjud qadam o'zgartirilmaydi — yangi versiya bilan tuzatiladi
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "schema_backfill", _progress_table),
+    Migration(2, "core", _core, _backfill_core),
+    Migration(3, "daily_rollups", _rollups),
+    Migration(4, "hub_pending", _hub_pending),
+    Migration(5, "sla_escalations", _sla),
+    Migration(6, "complaint_media", _media),
+    Migration(7, "decision_secs", _decision_secs, _backfill_decision_secs),
+    Migration(8, "complaint_events", _events, _backfill_events),
+    Migration(9, "hub_pushed", _hub_pushed),
+    Migration(10, "event_checkpoints", _event_checkpoints),
+    Migration(11, "inline_event_totals", _inline_totals),
+)
+
+
+def user_version(con: sqlite3.Connection) -> int:
+    return int(con.execute("PRAGMA main.user_version").fetchone()[0])
+
+
+def is_behind(db_path: str) -> bool:
+    """Qo'llanmagan qadam bormi — faqat PRAGMA o'qish (fayl o'zgarmaydi)."""
+    con = sqlite3.connect(db_path)
+    try:
+        return user_version(con) < MIGRATIONS[-1].version
+    finally:
+        con.close()
+
+
+def migrate(con: sqlite3.Connection, employees: list[str] = ()) -> list[str]:
+    """
+    user_version dan keyingi DDL qadamlar. con — view siz ulanish (arxiv ATTACH qilingan).
+    Qo'llanganlari nomini qaytaradi; hammasi qo'llangan bo'lsa — bitta PRAGMA o'qish.
+    employees — konfiguratsiyadagi xodimlar, har boot da lug'atga (ro'yxat env da o'zgarishi mumkin).
+    """
+    current = user_version(con)
+    applied = []
+    for m in MIGRATIONS:
+        if m.version <= current:
+            continue
+        con.execute("BEGIN")
+        try:
+            m.ddl(con)
+            if m.backfill:
+                con.execute(
+                    "INSERT OR IGNORE INTO schema_backfill(version, name) VALUES(?, ?)", (m.version, m.name)
+                )
+            con.execute(f"PRAGMA main.user_version = {m.version}")
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        applied.append(m.name)
+        log.warning("Migration %s (%s) applied", m.version, m.name)
+    if employees:
+        with con:
+            n = schema.seed_employees(con, list(employees))
+        if n:
+            log.info("Employees seeded: %s", n)
+    return applied
+
+
+def _connect(db_path: str, archive_path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(db_path, timeout=30)
+    archive.attach_archive(con, archive_path, view=False)
+    return con
+
+
+def pending_backfills(db_path: str, archive_path: str) -> list[tuple[Migration, int, int]]:
+    con = _connect(db_path, archive_path)
+    # tartib bilan: keyingi backfill lar (decision_secs, events) ko'chirilgan qatorlarni ko'rishi kerak
+    rows = con.execute(
+        "SELECT version, last_id, rows FROM schema_backfill WHERE done = 0 ORDER BY version"
+    ).fetchall()
+    con.close()
+    by_version = {m.version: m for m in MIGRATIONS}
+    return [(by_version[v], last, n) for v, last, n in rows if v in by_version and by_version[v].backfill]
+
+
+def _backfill_chunk(db_path: str, archive_path: str, m: Migration, after: int, batch: int) -> tuple[int, int]:
+    """Bitta partiya va uning holati — bitta tranzaksiyada; uzilsa shu joydan davom etadi."""
+    con = _connect(db_path, archive_path)
+    try:
+        # qulf partiya o'qishlaridan oldin — oraliqda jonli yozuv tushib, ikki marta sanalmasin
+        con.execute("BEGIN IMMEDIATE")
+        with con:
+            last, n = m.backfill(con, after, batch)
+            con.execute(
+                "UPDATE schema_backfill SET last_id = ?, rows = rows + ?, done = ? WHERE version = ?",
+                (last, n, int(n == 0), m.version),
+            )
+        return last, n
+    finally:
+        con.close()
+
+
+async def run_backfills(db_path: str, archive_path: str, batch: int = MIGRATION_BATCH) -> None:
+    for m, last, total in await asyncio.to_thread(pending_backfills, db_path, archive_path):
+        log.info("Backfill %s (%s): davom, id > %s", m.version, m.name, last)
+        while True:
+            last, n = await asyncio.to_thread(_backfill_chunk, db_path, archive_path, m, last, batch)
+            if not n:
+                break
+            # partiya commit qilindi — API/panel keshlari backfill qilingan qatorlarni ko'rsin
+            versions.bump_all()
+            total += n
+            log.info("Backfill %s (%s): id <= %s, %s qator", m.version, m.name, last, total)
+            await asyncio.sleep(MIGRATION_PAUSE)
+        log.warning("Backfill %s (%s): tayyor", m.version, m.name)
@@ -0,0 +1,117 @@
+"""Chiquvchi xabarlar byudjeti — bo'lim bo'yicha token bucket; bir bo'limning to'lqini boshqasini kutdirmaydi."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram.exceptions import TelegramRetryAfter
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# Telegram: guruhga ~20 xabar/daqiqa
+DEPT_SEND_PER_MIN = max(1.0, float(os.getenv("DEPT_SEND_PER_MIN", "20")))
+DEPT_SEND_BURST = max(1, int(os.getenv("DEPT_SEND_BURST", "5")))
+_RETRIES = 2
+
+
+class _Bucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0  # RetryAfter dan keyin butun bo'lim kutadi
+
+    async def take(self) -> None:
+        # faqat bo'lim worker i chaqiradi — qulf kerak emas
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Outbox:
+    """
+    Har bo'limga navbat va bitta worker: send(key, factory) navbatga qo'yib natijani kutadi,
+    worker byudjet bo'yicha kelish tartibida yuboradi. Handler kutmasligi uchun send() fon vazifadan chaqiriladi.
+    """
+
+    def __init__(self, per_min: float = DEPT_SEND_PER_MIN, burst: int = DEPT_SEND_BURST):
+        self.rate = per_min / 60
+        self.burst = burst
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def _queue(self, key: str) -> asyncio.Queue:
+        q = self._queues.get(key)
+        if q is None:
+            q = self._queues[key] = asyncio.Queue()
+            self._tasks[key] = asyncio.get_running_loop().create_task(self._run(key, q), name=f"outbox:{key}")
+        return q
+
+    def _gauge(self) -> None:
+        metrics.set_gauge("outbox_queue_depth", sum(q.qsize() for q in self._queues.values()))
+
+    async def send(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        self._queue(key).put_nowait((factory, fut, time.monotonic()))
+        self._gauge()
+        return await fut
+
+    async def _run(self, key: str, queue: asyncio.Queue) -> None:
+        bucket = _Bucket(self.rate, self.burst)
+        while True:
+            factory, fut, enqueued = await queue.get()
+            self._gauge()
+            if fut.done():  # kutuvchi bekor qilingan
+                continue
+            try:
+                result = await self._send(key, bucket, factory, enqueued)
+            except asyncio.CancelledError:
+                fut.cancel()
+                raise
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+            else:
+                if not fut.done():
+                    fut.set_result(result)
+
+    async def _send(self, key: str, bucket: _Bucket, factory: Callable[[], Awaitable[Any]], enqueued: float) -> Any:
+        for attempt in range(_RETRIES + 1):
+            await bucket.take()
+            metrics.observe("outbox_wait_ms", (time.monotonic() - enqueued) * 1000)
+            try:
+                return await factory()
+            except TelegramRetryAfter as e:
+                metrics.inc("outbox_retry_after")
+                bucket.paused_until = time.monotonic() + e.retry_after
+                if attempt == _RETRIES:
+                    raise
+                log.warning("Outbox %s: RetryAfter %ss", key, e.retry_after)
+                enqueued = time.monotonic()
+
+    async def close(self) -> None:
+        """Shutdown: worker lar to'xtaydi, navbatda qolganlarning kutuvchilari bekor qilinadi."""
+        for t in self._tasks.values():
+            t.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        for q in self._queues.values():
+            while not q.empty():
+                _, fut, _ = q.get_nowait()
+                fut.cancel()
+        self._tasks.clear()
+        self._queues.clear()
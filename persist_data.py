@@ -5,6 +5,8 @@ from __future__ import annotations
 import logging
 import os
 import shutil
+import sqlite3
+import time
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -13,6 +15,12 @@ TZ = ZoneInfo(os.getenv("TZ", "Asia/Tashkent"))
 
 DEFAULT_DATA_DIR = "/data"
 _STARTUP_BACKUP_KEEP = max(5, int(os.getenv("STARTUP_BACKUP_KEEP", "30")))
+# Bitta incremental_vacuum chaqiruvida bo'shatiladigan sahifalar (4 KB) — tungi ishni cheklaydi
+_VACUUM_PAGES = max(100, int(os.getenv("MAINT_VACUUM_PAGES", "2000")))
+_MAINT_BUSY_MS = max(100, int(os.getenv("MAINT_BUSY_MS", "2000")))
+
+# Oxirgi texnik xizmat natijalari: kind -> {at, ok, ms, detail}
+_MAINTENANCE: dict[str, dict] = {}
 
 
 def resolve_db_path(*, env_key: str = "DB_PATH", default_filename: str = "complaints.sqlite3") -> str:
@@ -91,24 +99,104 @@ def startup_sqlite_backup(db_path: str, backup_dir: str | None = None) -> str |
     stamp = datetime.now(TZ).strftime("%Y%m%d_%H%M%S")
     dest = os.path.join(out, f"startup_{stamp}.db")
     try:
-        shutil.copy2(db_path, dest)
+        # WAL rejimida fayl nusxasi oxirgi commitlarni yo'qotishi mumkin — backup API
+        src = sqlite3.connect(db_path)
+        dst = sqlite3.connect(dest)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
         log.info("Startup zaxira: %s", dest)
         _prune_backups(out, "startup_", _STARTUP_BACKUP_KEEP)
         return dest
-    except OSError as exc:
+    except (OSError, sqlite3.Error) as exc:
         log.error("Startup zaxira xato: %s", exc)
         return None
 
 
+def prepare_sqlite_file(db_path: str) -> None:
+    """Bir martalik migratsiya: WAL + auto_vacuum=INCREMENTAL (faqat o'zgartirish kerak bo'lsa VACUUM)."""
+    con = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if con.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+            con.execute("PRAGMA journal_mode=WAL")
+        if con.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            t0 = time.monotonic()
+            con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            con.execute("VACUUM")
+            log.warning(
+                "auto_vacuum=INCREMENTAL yoqildi: %s (%.0f ms)", db_path, (time.monotonic() - t0) * 1000
+            )
+    finally:
+        con.close()
+
+
+def _file_kb(path: str) -> int:
+    return (os.path.getsize(path) // 1024) if os.path.isfile(path) else 0
+
+
+def sqlite_maintenance(db_path: str, kind: str, label: str | None = None) -> dict:
+    """
+    kind: optimize | checkpoint | vacuum | quick_check.
+    busy_timeout bilan cheklangan — band bo'lsa kutib turmaydi, keyingi safar qiladi.
+    """
+    t0 = time.monotonic()
+    ok = True
+    detail = ""
+    con = sqlite3.connect(db_path, isolation_level=None, timeout=_MAINT_BUSY_MS / 1000)
+    try:
+        con.execute(f"PRAGMA busy_timeout={_MAINT_BUSY_MS}")
+        if kind == "optimize":
+            con.execute("PRAGMA optimize")
+        elif kind == "checkpoint":
+            busy, wal_pages, done = con.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            ok = busy == 0
+            detail = f"wal={wal_pages} ckpt={done}"
+        elif kind == "vacuum":
+            before = con.execute("PRAGMA freelist_count").fetchone()[0]
+            # execute() faqat bitta qadam bajaradi — executescript oxirigacha yuritadi
+            con.executescript(f"PRAGMA incremental_vacuum({_VACUUM_PAGES});")
+            after = con.execute("PRAGMA freelist_count").fetchone()[0]
+            detail = f"freed={before - after} left={after}"
+        elif kind == "quick_check":
+            rows = [r[0] for r in con.execute("PRAGMA quick_check").fetchall()]
+            ok = rows == ["ok"]
+            detail = "ok" if ok else "; ".join(rows[:3])
+        else:
+            raise ValueError(f"unknown maintenance kind: {kind}")
+    except sqlite3.Error as exc:
+        ok = False
+        detail = str(exc)[:120]
+    finally:
+        con.close()
+    res = {
+        "at": datetime.now(TZ).strftime("%d.%m %H:%M"),
+        "ok": ok,
+        "ms": int((time.monotonic() - t0) * 1000),
+        "detail": detail,
+        "kb": _file_kb(db_path),
+        "wal_kb": _file_kb(db_path + "-wal"),
+    }
+    _MAINTENANCE[label or kind] = res
+    (log.info if ok else log.error)("SQLite %s %s: %s", kind, db_path, res)
+    return res
+
+
 def bootstrap_persistence(
     db_path: str,
     *,
     legacy_names: tuple[str, ...] = ("complaints.sqlite3",),
+    backup: bool = True,
 ) -> dict:
+    """
+    DB ochilishidan oldingi qism. Legacy migratsiya — DB allaqachon bo'lsa bitta stat.
+    backup=False: zaxirani chaqiruvchi keyin fonda qiladi (startup_sqlite_backup).
+    """
     path = os.path.abspath(db_path)
     ensure_data_dir(path)
     migrated_from = migrate_legacy_db(path, *legacy_names)
-    backup_file = startup_sqlite_backup(path)
+    backup_file = startup_sqlite_backup(path) if backup else None
     volume = has_railway_volume()
     if not volume and path.startswith("/data"):
         log.critical(
@@ -123,11 +211,19 @@ def bootstrap_persistence(
     }
 
 
-def persistence_status_line(db_path: str) -> str:
+def persistence_status_line(db_path: str, archive_path: str | None = None) -> str:
     vol = has_railway_volume()
     mount = os.getenv("RAILWAY_VOLUME_MOUNT_PATH", "") or "—"
     size = os.path.getsize(db_path) if os.path.isfile(db_path) else 0
-    return (
-        f"DB: {db_path} ({size // 1024} KB) · "
-        f"Volume: {'✅' if vol else '❌'} ({mount})"
-    )
+    line = f"DB: {db_path} ({size // 1024} KB) · "
+    if archive_path:
+        arch = os.path.getsize(archive_path) if os.path.isfile(archive_path) else 0
+        line += f"Archive: {arch // 1024} KB · "
+    line += f"WAL: {_file_kb(db_path + '-wal')} KB · "
+    line += f"Volume: {'✅' if vol else '❌'} ({mount})"
+    if _MAINTENANCE:
+        line += "\nMaint: " + " · ".join(
+            f"{kind} {'✅' if r['ok'] else '❌'} {r['ms']}ms {r['at']}" + (f" ({r['detail']})" if r["detail"] else "")
+            for kind, r in _MAINTENANCE.items()
+        )
+    return line
@@ -0,0 +1,152 @@
+"""Kunlik/haftalik hisobotlar — daily_rollups agregatlaridan, bitta SQL o'tishda."""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, timedelta
+
+# Kech qaror qilingan shikoyatlar ham hisobga tushishi uchun oxirgi N kun qayta hisoblanadi.
+# Undan eski kunlar muzlatilgan — tarix o'sgani bilan hisobot vaqti o'zgarmaydi.
+ROLLUP_REFRESH_DAYS = 14
+
+ROLLUPS_DDL = """
+    CREATE TABLE IF NOT EXISTS daily_rollups (
+        day TEXT NOT NULL,
+        employee_id INTEGER NOT NULL,
+        opened INTEGER NOT NULL DEFAULT 0,     -- NEW
+        closed INTEGER NOT NULL DEFAULT 0,     -- DONE
+        rejected INTEGER NOT NULL DEFAULT 0,   -- REJECT
+        decided INTEGER NOT NULL DEFAULT 0,
+        decision_secs INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, employee_id)
+    ) WITHOUT ROWID
+"""
+
+
+def refresh_rollups(con: sqlite3.Connection, last_day: date, days: int = ROLLUP_REFRESH_DAYS) -> None:
+    """
+    [last_day - days + 1, last_day] oralig'ini created_at indeksi bo'yicha bitta GROUP BY bilan yangilaydi.
+    Lug'at jadvaliga JOIN shart emas — to'g'ridan-to'g'ri jonli/arxiv jadvallar.
+    """
+    first = (last_day - timedelta(days=days - 1)).isoformat()
+    end = (last_day + timedelta(days=1)).isoformat()
+    with con:
+        con.execute("DELETE FROM daily_rollups WHERE day >= ? AND day < ?", (first, end))
+        con.execute(
+            """
+            INSERT INTO daily_rollups(day, employee_id, opened, closed, rejected, decided, decision_secs)
+            SELECT substr(created_at, 1, 10) AS day, employee_id,
+                   SUM(status = 'NEW'), SUM(status = 'DONE'), SUM(status = 'REJECT'),
+                   SUM(decided_at IS NOT NULL),
+                   COALESCE(SUM(decision_secs), 0)
+            FROM (
+                SELECT employee_id, created_at, status, decided_at, decision_secs FROM main.complaints
+                UNION ALL
+                SELECT employee_id, created_at, status, decided_at, decision_secs FROM arch.complaints
+            )
+            WHERE created_at >= ? AND created_at < ?
+            GROUP BY day, employee_id
+            """,
+            (first, end),
+        )
+
+
+def daily_rows(con: sqlite3.Connection, day: date) -> list[sqlite3.Row]:
+    return con.execute(
+        """
+        SELECT e.name AS employee, opened, closed, rejected, decided, decision_secs
+        FROM daily_rollups d JOIN employees e ON e.id = d.employee_id
+        WHERE day = ?
+        ORDER BY opened + closed + rejected DESC, employee
+        """,
+        (day.isoformat(),),
+    ).fetchall()
+
+
+def weekly_rows(con: sqlite3.Connection, last_day: date) -> list[sqlite3.Row]:
+    """Oxirgi 7 kun va undan oldingi 7 kun — xodim bo'yicha, bitta so'rovda."""
+    cur_start = (last_day - timedelta(days=6)).isoformat()
+    prev_start = (last_day - timedelta(days=13)).isoformat()
+    return con.execute(
+        """
+        SELECT e.name AS employee,
+               SUM(CASE WHEN day >= :cur THEN opened + closed + rejected ELSE 0 END) AS cur_total,
+               SUM(CASE WHEN day <  :cur THEN opened + closed + rejected ELSE 0 END) AS prev_total,
+               SUM(CASE WHEN day >= :cur THEN opened ELSE 0 END) AS cur_open,
+               SUM(CASE WHEN day >= :cur THEN closed ELSE 0 END) AS cur_closed,
+               SUM(CASE WHEN day >= :cur THEN rejected ELSE 0 END) AS cur_rejected,
+               SUM(CASE WHEN day >= :cur THEN decided ELSE 0 END) AS cur_decided,
+               SUM(CASE WHEN day >= :cur THEN decision_secs ELSE 0 END) AS cur_secs
+        FROM daily_rollups d JOIN employees e ON e.id = d.employee_id
+        WHERE day >= :prev AND day <= :last
+        GROUP BY d.employee_id
+        ORDER BY cur_total DESC, employee
+        """,
+        {"cur": cur_start, "prev": prev_start, "last": last_day.isoformat()},
+    ).fetchall()
+
+
+def fmt_duration(secs: float) -> str:
+    secs = int(secs)
+    if secs <= 0:
+        return "—"
+    hours, rem = divmod(secs, 3600)
+    if hours >= 24:
+        return f"{hours // 24}к {hours % 24}с"
+    if hours:
+        return f"{hours}с {rem // 60}дақ"
+    return f"{max(1, rem // 60)}дақ"
+
+
+def _avg(secs: int, decided: int) -> str:
+    return fmt_duration(secs / decided) if decided else "—"
+
+
+def _trend(cur: int, prev: int) -> str:
+    if cur > prev:
+        return f"📈 +{cur - prev}"
+    if cur < prev:
+        return f"📉 −{prev - cur}"
+    return "➖ 0"
+
+
+def format_daily_report(day: date, rows: list[sqlite3.Row], week: list[sqlite3.Row]) -> str:
+    lines = [f"🗓 <b>Кунлик ҳисобот</b> — {day.strftime('%d.%m.%Y')}\n"]
+    if not rows:
+        lines.append("Шу кун шикоят тушмади.")
+    tot_open = tot_closed = tot_rej = tot_decided = tot_secs = 0
+    for r in rows:
+        tot_open += r["opened"]
+        tot_closed += r["closed"]
+        tot_rej += r["rejected"]
+        tot_decided += r["decided"]
+        tot_secs += r["decision_secs"]
+        lines.append(
+            f"• <b>{r['employee']}</b>: 🆕 {r['opened']} | ✅ {r['closed']} | ❌ {r['rejected']}"
+            f" | ⏱ {_avg(r['decision_secs'], r['decided'])}"
+        )
+    if rows:
+        lines.append(
+            f"\nЖами: 🆕 {tot_open} | ✅ {tot_closed} | ❌ {tot_rej}"
+            f" | ⏱ ўртача {_avg(tot_secs, tot_decided)}"
+        )
+    if week:
+        cur = sum(int(r["cur_total"] or 0) for r in week)
+        prev = sum(int(r["prev_total"] or 0) for r in week)
+        lines.append(f"7 кунлик тренд: <b>{cur}</b> ({_trend(cur, prev)})")
+    return "\n".join(lines)
+
+
+def format_weekly_report(last_day: date, week: list[sqlite3.Row]) -> str:
+    first = last_day - timedelta(days=6)
+    lines = [f"📊 <b>Ҳафталик ҳисобот</b> — {first.strftime('%d.%m')}–{last_day.strftime('%d.%m.%Y')}\n"]
+    rows = [r for r in week if r["cur_total"] or r["prev_total"]]
+    if not rows:
+        lines.append("Икки ҳафтада шикоят тушмади.")
+    for r in rows:
+        lines.append(
+            f"• <b>{r['employee']}</b>: {r['cur_total']} ({_trend(r['cur_total'], r['prev_total'])})\n"
+            f"   🆕 {r['cur_open']} | ✅ {r['cur_closed']} | ❌ {r['cur_rejected']}"
+            f" | ⏱ {_avg(r['cur_secs'], r['cur_decided'])}"
+        )
+    return "\n".join(lines)
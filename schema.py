@@ -0,0 +1,266 @@
+"""Shikoyatlar sxemasi — xodim/muallif lug'at jadvallari, butun sonli kalitlar, migratsiya."""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+
+log = logging.getLogger(__name__)
+
+LOOKUP_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS employees (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS reporters (
+        id INTEGER PRIMARY KEY,
+        tg_id INTEGER NOT NULL UNIQUE,
+        name TEXT NOT NULL
+    )
+    """,
+)
+
+# Ilovalar faqat Telegram file_id bo'yicha — fayl yuklab olinmaydi. Arxivlashda ko'chmaydi (id o'zgarmaydi).
+MEDIA_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS complaint_media (
+        id INTEGER PRIMARY KEY,
+        complaint_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,  -- photo / document / voice
+        file_id TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_media_complaint ON complaint_media(complaint_id)",
+)
+
+# Jonli va arxiv jadvallari bir xil ustunlar; arxivda id AUTOINCREMENT emas (ko'chiriladi)
+_COMPLAINTS_COLUMNS = """
+        employee_id INTEGER NOT NULL,
+        reporter_id INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'NEW',  -- NEW / DONE / REJECT
+        decided_by INTEGER,
+        decided_at TEXT,
+        decision_note TEXT,
+        group_chat_id INTEGER,
+        group_message_id INTEGER,
+        decision_secs INTEGER  -- qaror vaqti - created_at, soniya (SLA)
+"""
+
+COLUMNS = (
+    "id, employee_id, reporter_id, text, created_at, status, "
+    "decided_by, decided_at, decision_note, group_chat_id, group_message_id, decision_secs"
+)
+
+# created_at -> decided_at soniyalarda; decided_at = ? parametr yoki ustun
+DECISION_SECS_SQL = "CAST((julianday({decided}) - julianday(created_at)) * 86400 AS INTEGER)"
+
+# Eski matnli ustunlar nomi bilan — admin_card, panel, eksport o'zgarmaydi
+_VIEW_SELECT = """
+    SELECT c.id, c.employee_id, e.name AS employee, c.reporter_id,
+           r.tg_id AS from_user_id, r.name AS from_user_name,
+           c.text, c.created_at, c.status, c.decided_by, c.decided_at, c.decision_note,
+           c.group_chat_id, c.group_message_id, c.decision_secs
+    FROM {schema}.complaints c
+    JOIN main.employees e ON e.id = c.employee_id
+    JOIN main.reporters r ON r.id = c.reporter_id
+"""
+
+# name -> id; tg_id -> (id, name). Bitta jarayon yozadi (leader lease), kesh izchil qoladi.
+_EMPLOYEE_IDS: dict[str, int] = {}
+_REPORTERS: dict[int, tuple[int, str]] = {}
+
+
+def reset_caches() -> None:
+    """Tranzaksiya qaytarilganda — keshdagi id lar bazada bo'lmasligi mumkin."""
+    _EMPLOYEE_IDS.clear()
+    _REPORTERS.clear()
+
+
+def complaints_ddl(schema: str, table: str = "complaints") -> str:
+    pk = "id INTEGER PRIMARY KEY AUTOINCREMENT" if schema == "main" else "id INTEGER PRIMARY KEY"
+    return f"CREATE TABLE IF NOT EXISTS {schema}.{table} (\n        {pk},{_COMPLAINTS_COLUMNS})"
+
+
+def complaints_indexes(schema: str) -> tuple[str, ...]:
+    prefix = "idx_complaints" if schema == "main" else "idx_arch"
+    return (
+        f"CREATE INDEX IF NOT EXISTS {schema}.{prefix}_employee ON complaints(employee_id)",
+        # ochiq shikoyatlar yoshi bo'yicha (SLA) — status bo'yicha filtrni ham qoplaydi
+        f"CREATE INDEX IF NOT EXISTS {schema}.{prefix}_status_created ON complaints(status, created_at)",
+        f"CREATE INDEX IF NOT EXISTS {schema}.{prefix}_created ON complaints(created_at)",
+    )
+
+
+def view_sql(name: str) -> str:
+    return (
+        f"CREATE TEMP VIEW IF NOT EXISTS {name} AS "
+        + _VIEW_SELECT.format(schema="main")
+        + " UNION ALL "
+        + _VIEW_SELECT.format(schema="arch")
+    )
+
+
+def columns(con: sqlite3.Connection, table: str, schema: str = "main") -> set[str]:
+    return {r[1] for r in con.execute(f"PRAGMA {schema}.table_info({table})").fetchall()}
+
+
+def lookup_employee_id(con: sqlite3.Connection, name: str) -> int | None:
+    """O'qish yo'li — faqat SELECT, lug'atga yozmaydi; noma'lum nom — None."""
+    eid = _EMPLOYEE_IDS.get(name)
+    if eid is None:
+        row = con.execute("SELECT id FROM employees WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        eid = int(row[0])
+        # ochiq tranzaksiyada ko'rilgan qator hali qaytarilishi mumkin — keshga faqat commit qilingani
+        if not con.in_transaction:
+            _EMPLOYEE_IDS[name] = eid
+    return eid
+
+
+def employee_id(con: sqlite3.Connection, name: str) -> int:
+    """Yozish yo'li — chaqiruvchi tranzaksiyasida qo'shadi; yangi id commit dan keyingi o'qishda keshlanadi."""
+    eid = lookup_employee_id(con, name)
+    if eid is None:
+        eid = int(con.execute("INSERT INTO employees(name) VALUES(?)", (name,)).lastrowid)
+    return eid
+
+
+def seed_employees(con: sqlite3.Connection, names: list[str]) -> int:
+    """Konfiguratsiyadagi xodimlar — o'qish yo'llari id ni SELECT bilan topadi. Qo'shilganlar soni."""
+    before = con.total_changes
+    con.executemany("INSERT OR IGNORE INTO employees(name) VALUES(?)", [(n,) for n in names])
+    return con.total_changes - before
+
+
+def reporter_id(con: sqlite3.Connection, tg_id: int, name: str) -> int:
+    cached = _REPORTERS.get(tg_id)
+    if cached and cached[1] == name:
+        return cached[0]
+    con.execute(
+        """
+        INSERT INTO reporters(tg_id, name) VALUES(?, ?)
+        ON CONFLICT(tg_id) DO UPDATE SET name = excluded.name
+        """,
+        (tg_id, name),
+    )
+    rid = int(con.execute("SELECT id FROM reporters WHERE tg_id = ?", (tg_id,)).fetchone()[0])
+    _REPORTERS[tg_id] = (rid, name)
+    return rid
+
+
+# Eski (matnli) jadval DDL qadamda shu nomga o'tkaziladi, backfill partiyalab ko'chiradi
+LEGACY_TABLE = "complaints_legacy"
+
+
+def has_table(con: sqlite3.Connection, table: str, schema: str = "main") -> bool:
+    return con.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def ensure_schema(con: sqlite3.Connection) -> None:
+    """
+    Lug'at jadvallari + jonli/arxiv complaints; ichida commit yo'q — chaqiruvchi tranzaksiyasida.
+    Eski matnli sxema bo'lsa — complaints_legacy ga qayta nomlanadi (tez), ko'chirish — normalize_chunk.
+    con — view siz ulanish (arxiv ATTACH qilingan), aks holda RENAME view ni tekshirib yiqiladi.
+    """
+    for ddl in LOOKUP_DDL:
+        con.execute(ddl)
+    legacy_seq = 0
+    for s in ("main", "arch"):
+        if "employee" not in columns(con, "complaints", s):
+            continue
+        # eski kodning yarim qolgan nusxasi — manba hali joyida
+        con.execute(f"DROP TABLE IF EXISTS {s}.complaints_v2")
+        # indeks nomlari sxema bo'yicha umumiy — yangi jadval indekslari bilan to'qnashmasin
+        for (name,) in con.execute(
+            f"SELECT name FROM {s}.sqlite_master WHERE type = 'index' AND tbl_name = 'complaints' AND sql IS NOT NULL"
+        ).fetchall():
+            con.execute(f"DROP INDEX {s}.{name}")
+        con.execute(f"ALTER TABLE {s}.complaints RENAME TO {LEGACY_TABLE}")
+        legacy_seq = max(legacy_seq, con.execute(f"SELECT COALESCE(MAX(id), 0) FROM {s}.{LEGACY_TABLE}").fetchone()[0])
+        if s == "main":
+            # o'chirilgan eng katta id ham qayta ishlatilmasin (RENAME sqlite_sequence yozuvini ham ko'chiradi)
+            row = con.execute(
+                f"SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('complaints', '{LEGACY_TABLE}')"
+            ).fetchone()
+            legacy_seq = max(legacy_seq, int(row[0] or 0))
+    for s in ("main", "arch"):
+        con.execute(complaints_ddl(s))
+        prefix = "idx_complaints" if s == "main" else "idx_arch"
+        # (status, created_at) qoplaydi
+        con.execute(f"DROP INDEX IF EXISTS {s}.{prefix}_status")
+        for ddl in complaints_indexes(s):
+            con.execute(ddl)
+    if legacy_seq:
+        # yangi shikoyatlar eski id lar bilan to'qnashmasin (eski qatorlar o'z id si bilan ko'chadi)
+        row = con.execute("SELECT seq FROM sqlite_sequence WHERE name = 'complaints'").fetchone()
+        if row is None:
+            con.execute("INSERT INTO sqlite_sequence(name, seq) VALUES('complaints', ?)", (legacy_seq,))
+        else:
+            con.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'complaints'", (legacy_seq,))
+
+
+def normalize_chunk(con: sqlite3.Connection, after: int, batch: int) -> tuple[int, int]:
+    """
+    complaints_legacy -> complaints (main va arch), id bo'yicha partiya; chaqiruvchi tranzaksiyasida.
+    Tugaganda eski jadvallar o'chiriladi. (last_id, ko'chirilgan qatorlar); 0 — tugadi.
+    """
+    legacy = [s for s in ("arch", "main") if has_table(con, LEGACY_TABLE, s)]
+    if not legacy:
+        return after, 0
+    row = con.execute(
+        "SELECT MAX(id), COUNT(*) FROM ("
+        + " UNION ALL ".join(f"SELECT id FROM {s}.{LEGACY_TABLE} WHERE id > :after" for s in legacy)
+        + " ORDER BY id LIMIT :batch)",
+        {"after": after, "batch": batch},
+    ).fetchone()
+    if row[0] is None:
+        for s in legacy:
+            con.execute(f"DROP TABLE {s}.{LEGACY_TABLE}")
+        return after, 0
+    last = int(row[0])
+    # shundan kattasi — ko'chirish boshlangandan keyingi jonli shikoyatlar
+    legacy_max = max(
+        con.execute(f"SELECT COALESCE(MAX(id), 0) FROM {s}.{LEGACY_TABLE}").fetchone()[0] for s in legacy
+    )
+    # arxiv avval — reporters da jonli jadvaldagi eng yangi ism qoladi
+    for s in legacy:
+        con.execute(
+            f"INSERT OR IGNORE INTO employees(name) "
+            f"SELECT DISTINCT employee FROM {s}.{LEGACY_TABLE} WHERE id > ? AND id <= ?",
+            (after, last),
+        )
+        # partiyadagi eng oxirgi ism; jonli shikoyati bor muallif ismi (yangiroq) tegilmaydi
+        con.execute(
+            f"""
+            INSERT INTO reporters(tg_id, name)
+            SELECT from_user_id, from_user_name FROM {s}.{LEGACY_TABLE}
+            WHERE id IN (
+                SELECT MAX(id) FROM {s}.{LEGACY_TABLE} WHERE id > ? AND id <= ? GROUP BY from_user_id
+            )
+            ON CONFLICT(tg_id) DO UPDATE SET name = excluded.name
+            WHERE NOT EXISTS (SELECT 1 FROM main.complaints c WHERE c.reporter_id = reporters.id AND c.id > ?)
+            """,
+            (after, last, legacy_max),
+        )
+        con.execute(
+            f"""
+            INSERT OR IGNORE INTO {s}.complaints({COLUMNS})
+            SELECT c.id, e.id, r.id, c.text, c.created_at, c.status, c.decided_by, c.decided_at,
+                   c.decision_note, c.group_chat_id, c.group_message_id,
+                   {DECISION_SECS_SQL.format(decided='c.decided_at')}
+            FROM {s}.{LEGACY_TABLE} c
+            JOIN main.employees e ON e.name = c.employee
+            JOIN main.reporters r ON r.tg_id = c.from_user_id
+            WHERE c.id > ? AND c.id <= ?
+            """,
+            (after, last),
+        )
+    return last, int(row[1])
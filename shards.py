@@ -0,0 +1,101 @@
+"""Update larni chat bo'yicha shard lash — bitta chat ichida tartib bilan, turli chatlar parallel (dp.update outer middleware)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# 0 — aiogram odatiy rejimi (har update alohida task, tartib kafolatsiz)
+UPDATE_WORKERS = max(0, int(os.getenv("UPDATE_WORKERS", "16")))
+# Shard navbati to'lsa polling sikli kutadi (getUpdates chaqirilmaydi) — backpressure
+UPDATE_QUEUE_SIZE = max(1, int(os.getenv("UPDATE_QUEUE_SIZE", "100")))
+
+Handler = Callable[[Any, dict[str, Any]], Awaitable[Any]]
+
+
+class ChatShardMiddleware:
+    """
+    chat_id (bo'lmasa user_id) % workers — o'sha shard navbatiga. Har shard bitta worker:
+    bir chatning update lari kelish tartibida, biri tugagach keyingisi.
+    start_polling(handle_as_tasks=False) bilan: polling sikli shu yerda put() da kutadi, handler ni
+    worker bajaradi. Handler xatosi worker da log qilinadi (aiogram _process_update kabi).
+    """
+
+    def __init__(self, workers: int = UPDATE_WORKERS, queue_size: int = UPDATE_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queues: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def handle_as_tasks(self) -> bool:
+        """start_polling uchun: shard lar yoqilgan bo'lsa update lar polling siklidan navbatga."""
+        return not self.workers
+
+    def _start(self) -> None:
+        self._queues = [asyncio.Queue(self.queue_size) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.get_running_loop().create_task(self._run(i), name=f"shard:{i}")
+            for i in range(self.workers)
+        ]
+
+    async def __call__(self, handler: Handler, event: Any, data: dict[str, Any]) -> Any:
+        if not self.workers:
+            return await handler(event, data)
+        if not self._tasks:
+            self._start()
+        chat = data.get("event_chat")
+        user = data.get("event_from_user")
+        key = chat.id if chat else user.id if user else getattr(event, "update_id", 0)
+        queue = self._queues[key % self.workers]
+
+        if queue.full():
+            metrics.inc("update_queue_full")
+        await queue.put((handler, event, data, time.monotonic()))
+        self._gauge()
+
+    def _gauge(self) -> None:
+        depths = [q.qsize() for q in self._queues]
+        metrics.set_gauge("update_queue_depth", sum(depths))
+        metrics.set_gauge("update_queue_depth_max", max(depths))
+
+    async def _run(self, shard: int) -> None:
+        queue = self._queues[shard]
+        while True:
+            handler, event, data, enqueued = await queue.get()
+            metrics.observe("update_wait_ms", (time.monotonic() - enqueued) * 1000)
+            self._gauge()
+            try:
+                await handler(event, data)
+            except Exception:
+                log.exception("Update %s: handler xato", getattr(event, "update_id", "?"))
+            finally:
+                queue.task_done()
+
+    async def close(self, timeout: float) -> int:
+        """
+        Shutdown (polling to'xtagach): navbatdagilar timeout gacha bajariladi, keyin worker lar
+        bekor qilinadi. Qaytaradi: bajarilmay qolgan update lar soni.
+        """
+        if not self._tasks:
+            return 0
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(q.join() for q in self._queues)), timeout=max(0.0, timeout)
+            )
+        except asyncio.TimeoutError:
+            pass
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        left = sum(q.qsize() for q in self._queues)
+        self._tasks = []
+        self._queues = []
+        return left
@@ -0,0 +1,119 @@
+"""SLA — ochiq shikoyatlar muddatlari min-heap da; keyingi muddatgacha uxlaydi (cron so'rovisiz)."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Awaitable, Callable
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# Bosqichlar, soat: "24,72" — 24 soatda birinchi eslatma, 72 da ikkinchisi. Bo'sh — o'chirilgan.
+SLA_HOURS = sorted(
+    float(x) for x in os.getenv("SLA_HOURS", "24,72").split(",") if x.strip().replace(".", "", 1).isdigit()
+)
+# Eslatma kimga: "admins" (ADMIN_IDS) yoki "group" (GROUP_ID)
+SLA_NOTIFY = os.getenv("SLA_NOTIFY", "admins").strip().lower()
+
+# Qaysi bosqich eslatmasi yuborilgan — restartda takrorlanmasin
+SLA_DDL = """
+    CREATE TABLE IF NOT EXISTS sla_escalations (
+        complaint_id INTEGER PRIMARY KEY,
+        level INTEGER NOT NULL
+    ) WITHOUT ROWID
+"""
+
+
+class EscalationEngine:
+    """
+    heap: (muddat_ts, cid, bosqich, created_ts). Qaror qilinganlar heap dan o'chirilmaydi —
+    _open dan chiqariladi va navbati kelganda tashlab yuboriladi (lazy deletion). created_ts
+    _open dagisidan farq qilsa — qayta ochilishdan oldingi eski yozuv, u ham tashlanadi.
+    """
+
+    def __init__(self, thresholds_hours: list[float] = SLA_HOURS):
+        self.steps = [h * 3600 for h in thresholds_hours]
+        self._heap: list[tuple[float, int, int, float]] = []
+        self._open: dict[int, float] = {}  # cid -> created_ts
+        self._wake = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def _push(self, cid: int, created_ts: float, level: int) -> None:
+        if level >= len(self.steps):
+            return
+        deadline = created_ts + self.steps[level]
+        earliest = not self._heap or deadline < self._heap[0][0]
+        heapq.heappush(self._heap, (deadline, cid, level, created_ts))
+        if earliest:
+            self._wake.set()  # yangi eng yaqin muddat — uyquni qisqartirish
+
+    def add(self, cid: int, created_ts: float, level: int = 0) -> None:
+        if not self.steps:
+            return
+        self._open[cid] = created_ts
+        self._push(cid, created_ts, level)
+        metrics.set_gauge("sla_open", len(self._open))
+
+    def discard(self, cid: int) -> None:
+        if self._open.pop(cid, None) is not None:
+            metrics.set_gauge("sla_open", len(self._open))
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._open.clear()
+        metrics.set_gauge("sla_open", 0)
+
+    def rebuild(self, rows: list[tuple[int, float, int]]) -> int:
+        """rows: (cid, created_ts, yuborilgan bosqichlar soni) — boot da SQLite dan."""
+        self.clear()
+        for cid, created_ts, level in rows:
+            self._open[cid] = created_ts
+            if level < len(self.steps):
+                self._heap.append((created_ts + self.steps[level], cid, level, created_ts))
+        heapq.heapify(self._heap)
+        self._wake.set()
+        metrics.set_gauge("sla_open", len(self._open))
+        return len(self._open)
+
+    def _pop_due(self, now: float) -> list[tuple[int, int, float]]:
+        """
+        Har cid uchun bitta yozuv — o'tib ketgan eng yuqori bosqich (uzilishdan keyin bir nechta
+        bosqich birdan o'tgan bo'lsa ham). Keyingi bosqich partiya yig'ilgach heap ga qaytadi.
+        """
+        due: dict[int, tuple[int, float]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, cid, level, created_ts = heapq.heappop(self._heap)
+            if self._open.get(cid) != created_ts:
+                continue
+            while level + 1 < len(self.steps) and created_ts + self.steps[level + 1] <= now:
+                level += 1
+            if cid not in due or due[cid][0] < level:
+                due[cid] = (level, created_ts)
+        for cid, (level, created_ts) in due.items():
+            self._push(cid, created_ts, level + 1)
+        return [(cid, level, created_ts) for cid, (level, created_ts) in due.items()]
+
+    async def run(self, notify: Callable[[list[tuple[int, int, float]]], Awaitable[None]]) -> None:
+        """Muddati o'tganlarni bitta partiyada notify((cid, bosqich, created_ts), ...) ga beradi."""
+        while True:
+            self._wake.clear()
+            due = self._pop_due(time.time())
+            if due:
+                metrics.inc("sla_breaches", len(due))
+                try:
+                    await notify(due)
+                except Exception as e:
+                    log.warning("SLA notify failed: %r", e)
+                continue
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,55 @@
+"""Ma'lumot versiyalari — yozuvlar oshiradi, xotiradagi keshlar (API, panel) shu bo'yicha eskiradi."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Callable, Hashable
+
+import metrics
+
+# Bitta jarayon yozadi (leader lease) — versiyalar shu jarayon ichida izchil
+_EPOCH = 0  # reset — hamma xodim versiyasi birdan eskiradi
+_GLOBAL = 0
+_EMPLOYEE: dict[int, int] = defaultdict(int)
+
+
+def bump(*employee_ids: int) -> None:
+    global _GLOBAL
+    _GLOBAL += 1
+    for eid in set(employee_ids):
+        _EMPLOYEE[eid] += 1
+
+
+def bump_all() -> None:
+    global _EPOCH, _GLOBAL
+    _EPOCH += 1
+    _GLOBAL += 1
+
+
+def current(employee_id: int | None = None) -> tuple[int, int]:
+    """(epoch, n) — kesh kaliti qismi. employee_id siz — umumiy versiya."""
+    if employee_id is None:
+        return _EPOCH, _GLOBAL
+    return _EPOCH, _EMPLOYEE[employee_id]
+
+
+class VersionedCache:
+    """key -> (versiya, qiymat). Versiya o'zgargan bo'lsa qayta quriladi; hit/miss — /metrics da."""
+
+    def __init__(self, name: str, max_items: int = 256):
+        self.name = name
+        self.max_items = max_items
+        self._items: dict[Hashable, tuple[Hashable, Any]] = {}
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], Any]) -> Any:
+        hit = self._items.get(key)
+        if hit is not None and hit[0] == version:
+            metrics.inc(f"{self.name}_hit")
+            return hit[1]
+        metrics.inc(f"{self.name}_miss")
+        value = build()
+        self._items.pop(key, None)
+        self._items[key] = (version, value)
+        while len(self._items) > self.max_items:
+            del self._items[next(iter(self._items))]
+        return value
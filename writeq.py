@@ -0,0 +1,131 @@
+"""Guruhli commit — bir vaqtda kelgan yozuvlar bitta tranzaksiyada, har biri o'z SAVEPOINT ida."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import metrics
+import schema
+
+log = logging.getLogger(__name__)
+
+WRITE_BATCH_MAX = max(1, int(os.getenv("WRITE_BATCH_MAX", "64")))
+# Birinchi yozuvdan keyin sheriklarni shuncha kutadi; 0 — faqat navbatda turganlari
+WRITE_BATCH_DELAY_MS = max(0.0, float(os.getenv("WRITE_BATCH_DELAY_MS", "5")))
+
+Op = Callable[[sqlite3.Connection], Any]
+
+
+class WriteQueue:
+    """
+    submit(op) -> op(con) natijasi (masalan lastrowid). op lar bitta yozuvchi thread da,
+    bitta ulanishda bajariladi; xato bergan op faqat o'z SAVEPOINT ini qaytaradi.
+    """
+
+    def __init__(self, db_path: str, max_batch: int = WRITE_BATCH_MAX, max_delay_ms: float = WRITE_BATCH_DELAY_MS):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="writeq")
+        self._con: sqlite3.Connection | None = None
+
+    async def submit(self, op: Op) -> Any:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run(), name="writeq")
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((op, fut))
+        return await fut
+
+    async def close(self) -> None:
+        """Navbatdagilarni yozib bo'lib to'xtaydi (shutdown)."""
+        if self._worker and not self._worker.done():
+            self._queue.put_nowait(None)
+            await self._worker
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_con)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    left = deadline - loop.time()
+                    if left <= 0:
+                        break
+                    try:
+                        nxt = await asyncio.wait_for(self._queue.get(), left)
+                    except asyncio.TimeoutError:
+                        break
+                if nxt is None:
+                    closing = True
+                    break
+                batch.append(nxt)
+
+            t0 = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._executor, self._write, [op for op, _ in batch])
+            except Exception as e:
+                results = [(False, e)] * len(batch)
+            metrics.inc("write_commits")
+            metrics.inc("write_ops", len(batch))
+            metrics.observe("write_batch_size", len(batch))
+            metrics.observe("write_commit_ms", (time.perf_counter() - t0) * 1000)
+            for (_, fut), (ok, value) in zip(batch, results):
+                if fut.done():
+                    continue
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(value)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._con is None:
+            # tranzaksiyalarni o'zimiz boshqaramiz
+            self._con = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._con.row_factory = sqlite3.Row
+        return self._con
+
+    def _close_con(self) -> None:
+        if self._con is not None:
+            self._con.close()
+            self._con = None
+
+    def _write(self, ops: list[Op]) -> list[tuple[bool, Any]]:
+        con = self._connection()
+        out: list[tuple[bool, Any]] = []
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for op in ops:
+                con.execute("SAVEPOINT op")
+                try:
+                    out.append((True, op(con)))
+                    con.execute("RELEASE op")
+                except Exception as e:
+                    con.execute("ROLLBACK TO op")
+                    con.execute("RELEASE op")
+                    # qaytarilgan INSERT dagi id lar keshda qolmasin
+                    schema.reset_caches()
+                    out.append((False, e))
+            con.execute("COMMIT")
+        except Exception:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            schema.reset_caches()
+            raise
+        return out
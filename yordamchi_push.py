@@ -118,7 +118,10 @@ async def push_to_yordamchi_hub(
 
 
 def push_to_yordamchi_hub_background(**kwargs) -> None:
+    # lifecycle.spawn — SIGTERM da yo'qolib ketmasin, shutdown kutib oladi
+    from lifecycle import spawn
+
     try:
-        asyncio.get_running_loop().create_task(push_to_yordamchi_hub(**kwargs))
+        spawn(push_to_yordamchi_hub(**kwargs), name=f"hub_push:{kwargs.get('tg_id')}")
     except RuntimeError:
         pass